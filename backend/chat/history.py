@@ -0,0 +1,186 @@
+import os
+import uuid
+from collections import Counter
+from typing import Any
+
+from langchain.agents.middleware import AgentMiddleware, AgentState
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import (
+    AnyMessage,
+    HumanMessage,
+    RemoveMessage,
+    ToolMessage,
+)
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+from langgraph.runtime import Runtime
+
+# Number of most recent user turns (a user message and everything after it)
+# that are always sent to the model verbatim.
+CHAT_KEEP_TURNS = int(os.getenv("CHAT_KEEP_TURNS", "4"))
+# Once the conversation is estimated to exceed this many tokens, turns older
+# than CHAT_KEEP_TURNS are folded into a running summary.
+CHAT_TOKEN_BUDGET = int(os.getenv("CHAT_TOKEN_BUDGET", "12000"))
+# Tool results outside the kept turns are cut down to this many characters.
+CHAT_TOOL_DIGEST_CHARS = int(os.getenv("CHAT_TOOL_DIGEST_CHARS", "500"))
+
+# Tags added to the summarization model call so streaming consumers can tell
+# it apart from the agent's own model calls.
+COMPACTION_TAG = "compaction"
+
+# Process-wide counters of compaction events, exposed by GET /chat/stats.
+compaction_stats: Counter = Counter()
+
+_SUMMARY_KEY = "conversation_summary"
+# Set on tool results that have already been cut down, so later model calls
+# leave them alone instead of digesting the digest.
+_DIGESTED_KEY = "digested"
+
+_SUMMARY_PROMPT = (
+    "Summarize the conversation below between a user and an assistant that "
+    "uses Google Drive, GitHub and Slack tools. Keep the user's goals, "
+    "decisions, names, IDs, file and repository references, and any facts "
+    "found through tools that may matter later. Be concise.\n\n{conversation}"
+)
+
+
+def _is_summary(message: AnyMessage) -> bool:
+    return bool(message.additional_kwargs.get(_SUMMARY_KEY))
+
+
+def _digest_tool_result(message: ToolMessage, limit: int) -> ToolMessage | None:
+    """Return a shortened copy of a bulky tool result, or None if it is small
+    or already a digest."""
+    content = message.content
+    if message.additional_kwargs.get(_DIGESTED_KEY):
+        return None
+    if not isinstance(content, str) or len(content) <= limit:
+        return None
+    return message.model_copy(
+        update={
+            "content": (
+                f"{content[:limit]}\n[Older tool output truncated: "
+                f"{len(content) - limit} of {len(content)} characters omitted. "
+                "Call the tool again if the full result is needed.]"
+            ),
+            "additional_kwargs": {
+                **message.additional_kwargs,
+                _DIGESTED_KEY: True,
+            },
+        }
+    )
+
+
+def _render(messages: list[AnyMessage]) -> str:
+    lines = []
+    for message in messages:
+        content = message.content if isinstance(message.content, str) else ""
+        if getattr(message, "tool_calls", None):
+            calls = ", ".join(call["name"] for call in message.tool_calls)
+            content = f"{content}\n(called tools: {calls})".strip()
+        lines.append(f"{message.type}: {content}")
+    return "\n".join(lines)
+
+
+class ConversationCompactionMiddleware(AgentMiddleware):
+    """Keep the prompt sent to the model within a token budget.
+
+    Before every model call, the last ``keep_turns`` user turns are kept
+    verbatim. Bulky tool results in older turns are replaced with short
+    digests, and once the conversation exceeds ``token_budget`` the older
+    turns are rolled into a running summary. The rewritten history replaces
+    the stored one, so the checkpoint shrinks along with the prompt.
+    """
+
+    def __init__(
+        self,
+        model: BaseChatModel,
+        *,
+        keep_turns: int = CHAT_KEEP_TURNS,
+        token_budget: int = CHAT_TOKEN_BUDGET,
+        tool_digest_chars: int = CHAT_TOOL_DIGEST_CHARS,
+    ):
+        super().__init__()
+        self.model = model
+        self.keep_turns = max(1, keep_turns)
+        self.token_budget = token_budget
+        self.tool_digest_chars = tool_digest_chars
+
+    def _kept_turns_start(self, messages: list[AnyMessage]) -> int:
+        turn_starts = [
+            i
+            for i, message in enumerate(messages)
+            if isinstance(message, HumanMessage) and not _is_summary(message)
+        ]
+        if len(turn_starts) <= self.keep_turns:
+            return 0
+        return turn_starts[-self.keep_turns]
+
+    async def _summarize(self, messages: list[AnyMessage]) -> str:
+        response = await self.model.ainvoke(
+            _SUMMARY_PROMPT.format(conversation=_render(messages)),
+            config={"tags": [COMPACTION_TAG]},
+        )
+        return response.text.strip()
+
+    async def abefore_model(
+        self, state: AgentState, runtime: Runtime
+    ) -> dict[str, Any] | None:
+        messages = state["messages"]
+        for message in messages:
+            if message.id is None:
+                message.id = str(uuid.uuid4())
+
+        cutoff = self._kept_turns_start(messages)
+        if cutoff == 0:
+            return None
+        old, kept = list(messages[:cutoff]), list(messages[cutoff:])
+
+        digested = []
+        for i, message in enumerate(old):
+            if isinstance(message, ToolMessage):
+                digest = _digest_tool_result(message, self.tool_digest_chars)
+                if digest is not None:
+                    old[i] = digest
+                    digested.append(digest)
+
+        tokens_before = count_tokens_approximately(messages)
+        tokens_after = count_tokens_approximately(old + kept)
+        if tokens_after <= self.token_budget:
+            if not digested:
+                return None
+            compaction_stats["tool_results_digested"] += len(digested)
+            print(
+                f"Compacted conversation: digested {len(digested)} tool results "
+                f"({tokens_before} -> {tokens_after} tokens)"
+            )
+            # Messages keep their ids, so these replace the originals in place.
+            return {"messages": digested}
+
+        try:
+            summary = await self._summarize(old)
+        except Exception as e:
+            compaction_stats["summary_failures"] += 1
+            print(f"Failed to summarize conversation: {e}")
+            return {"messages": digested} if digested else None
+
+        summary_message = HumanMessage(
+            content=f"Summary of the earlier conversation:\n\n{summary}",
+            additional_kwargs={_SUMMARY_KEY: True},
+        )
+        tokens_after = count_tokens_approximately([summary_message, *kept])
+        compaction_stats["tool_results_digested"] += len(digested)
+        compaction_stats["summaries"] += 1
+        compaction_stats["messages_summarized"] += len(old)
+        compaction_stats["tokens_saved"] += max(0, tokens_before - tokens_after)
+        print(
+            f"Compacted conversation: summarized {len(old)} messages "
+            f"({tokens_before} -> {tokens_after} tokens)"
+        )
+        return {
+            "messages": [
+                RemoveMessage(id=REMOVE_ALL_MESSAGES),
+                summary_message,
+                *kept,
+            ]
+        }
@@ -1,17 +1,28 @@
+import json
+
 from database import get_db
 from fastapi import APIRouter, Depends, HTTPException
-from mcp_agent import create_mcp_agent
+from fastapi.responses import StreamingResponse
+from mcp_agent import create_agent_config, create_mcp_agent
 from models import User
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from auth.deps import get_current_user
+from chat.history import COMPACTION_TAG, compaction_stats
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
+# Tool outputs forwarded in tool_end events are cut to this many characters;
+# the agent itself still sees the full output.
+STREAM_TOOL_OUTPUT_CHARS = 2000
+
 class AgentRequest(BaseModel):
     query: str
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
 @router.post("/agent")
 async def run_agent(
     data: AgentRequest,
@@ -19,13 +30,89 @@ async def run_agent(
     db: AsyncSession = Depends(get_db),
 ):
     try:
-        agent_executor = await create_mcp_agent(user_id=user.id, db=db)
-        thread_id = f"user-{user.id}"
+        agent_executor = await create_mcp_agent()
+        config = await create_agent_config(
+            user_id=user.id, db=db, thread_id=f"user-{user.id}"
+        )
         result = await agent_executor.ainvoke(
             {"messages": [{"role": "user", "content": data.query}]},
-            config={"configurable": {"thread_id": thread_id}},
+            config=config,
         )
         return {"response": result["messages"][-1].content}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) from e
 
+@router.post("/agent/stream")
+async def stream_agent(
+    data: AgentRequest,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Run the agent and stream its progress as server-sent events.
+
+    Events: ``start``, ``token`` (LLM output chunks), ``tool_start``,
+    ``tool_end``, ``final`` (the complete answer) and ``error``.
+    """
+
+    async def events():
+        # The agent is set up after ``start`` so the client hears back at
+        # once, and setup failures arrive as ``error`` events like any other.
+        yield _sse("start", {})
+        try:
+            agent_executor = await create_mcp_agent()
+            config = await create_agent_config(
+                user_id=user.id, db=db, thread_id=f"user-{user.id}"
+            )
+            # Runs started inside a tool are its internals, whose inputs may
+            # hold the user's OAuth token; only the agent's tool calls go out.
+            tool_runs = set()
+            async for event in agent_executor.astream_events(
+                {"messages": [{"role": "user", "content": data.query}]},
+                config=config,
+                version="v2",
+            ):
+                kind = event["event"]
+                if COMPACTION_TAG in event.get("tags", []):
+                    continue
+                if tool_runs.intersection(event["parent_ids"]):
+                    continue
+                if kind == "on_chat_model_stream":
+                    text = event["data"]["chunk"].text
+                    if text:
+                        yield _sse("token", {"content": text})
+                elif kind == "on_tool_start":
+                    tool_runs.add(event["run_id"])
+                    yield _sse(
+                        "tool_start",
+                        {
+                            "run_id": event["run_id"],
+                            "name": event["name"],
+                            "input": event["data"].get("input"),
+                        },
+                    )
+                elif kind == "on_tool_end":
+                    output = event["data"].get("output")
+                    output = str(getattr(output, "content", output))
+                    yield _sse(
+                        "tool_end",
+                        {
+                            "run_id": event["run_id"],
+                            "name": event["name"],
+                            "output": output[:STREAM_TOOL_OUTPUT_CHARS],
+                        },
+                    )
+                elif kind == "on_chain_end" and not event["parent_ids"]:
+                    messages = event["data"]["output"]["messages"]
+                    yield _sse("final", {"response": messages[-1].content})
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/stats")
+async def chat_stats(user: User = Depends(get_current_user)):
+    return {"compaction": dict(compaction_stats)}
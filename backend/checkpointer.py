@@ -0,0 +1,369 @@
+import asyncio
+import datetime
+import os
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Sequence
+from typing import Any
+
+from database import AsyncSessionLocal
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    copy_checkpoint,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from models import ConversationCheckpoint, ConversationCheckpointWrite
+from sqlalchemy import delete
+from sqlalchemy.future import select
+
+# Only the newest few checkpoints of a thread are needed to resume it; older
+# ones (and their pending writes) are deleted as new checkpoints are written.
+CHECKPOINT_KEEP_PER_THREAD = int(os.getenv("CHECKPOINT_KEEP_PER_THREAD", "3"))
+# Threads with no new checkpoint for this many days are deleted entirely.
+CHECKPOINT_RETENTION_DAYS = float(os.getenv("CHECKPOINT_RETENTION_DAYS", "30"))
+CHECKPOINT_PRUNE_INTERVAL = float(os.getenv("CHECKPOINT_PRUNE_INTERVAL", "3600"))
+# Number of threads whose latest checkpoint is kept deserialized in memory.
+CHECKPOINT_CACHE_SIZE = int(os.getenv("CHECKPOINT_CACHE_SIZE", "256"))
+
+
+def _thread_config(
+    thread_id: str, checkpoint_ns: str, checkpoint_id: str
+) -> RunnableConfig:
+    return {
+        "configurable": {
+            "thread_id": thread_id,
+            "checkpoint_ns": checkpoint_ns,
+            "checkpoint_id": checkpoint_id,
+        }
+    }
+
+
+class SQLAlchemyCheckpointSaver(BaseCheckpointSaver):
+    """LangGraph checkpointer stored in the application database.
+
+    Conversation state survives restarts and is shared by every backend
+    worker. Each thread keeps only its newest ``keep_per_thread`` checkpoints,
+    idle threads are pruned after ``retention_days``, and the latest
+    checkpoint of recently used threads is cached in memory. The cache is
+    validated against the newest checkpoint id on every read, so a thread
+    advanced by another worker is never served stale.
+    """
+
+    def __init__(
+        self,
+        *,
+        keep_per_thread: int = CHECKPOINT_KEEP_PER_THREAD,
+        retention_days: float = CHECKPOINT_RETENTION_DAYS,
+        cache_size: int = CHECKPOINT_CACHE_SIZE,
+    ):
+        super().__init__()
+        self.keep_per_thread = max(1, keep_per_thread)
+        self.retention_days = retention_days
+        self.cache_size = cache_size
+        self._cache: OrderedDict[tuple[str, str], CheckpointTuple] = OrderedDict()
+        self._prune_task: asyncio.Task | None = None
+        self.hits = 0
+        self.misses = 0
+
+    def _remember(self, key: tuple[str, str], checkpoint_tuple: CheckpointTuple):
+        if self.cache_size <= 0:
+            return
+        self._cache[key] = checkpoint_tuple
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def _load_writes(
+        self, db, thread_id: str, checkpoint_ns: str, checkpoint_id: str
+    ) -> list[tuple[str, str, Any]]:
+        result = await db.execute(
+            select(ConversationCheckpointWrite)
+            .where(
+                ConversationCheckpointWrite.thread_id == thread_id,
+                ConversationCheckpointWrite.checkpoint_ns == checkpoint_ns,
+                ConversationCheckpointWrite.checkpoint_id == checkpoint_id,
+            )
+            .order_by(
+                ConversationCheckpointWrite.task_id, ConversationCheckpointWrite.idx
+            )
+        )
+        return [
+            (w.task_id, w.channel, self.serde.loads_typed((w.value_type, w.value)))
+            for w in result.scalars().all()
+        ]
+
+    def _to_tuple(
+        self, row: ConversationCheckpoint, pending_writes: list
+    ) -> CheckpointTuple:
+        return CheckpointTuple(
+            config=_thread_config(row.thread_id, row.checkpoint_ns, row.checkpoint_id),
+            checkpoint=self.serde.loads_typed((row.checkpoint_type, row.checkpoint)),
+            metadata=self.serde.loads_typed(
+                (row.metadata_type, row.checkpoint_metadata)
+            ),
+            parent_config=(
+                _thread_config(
+                    row.thread_id, row.checkpoint_ns, row.parent_checkpoint_id
+                )
+                if row.parent_checkpoint_id
+                else None
+            ),
+            pending_writes=pending_writes,
+        )
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        key = (thread_id, checkpoint_ns)
+
+        async with AsyncSessionLocal() as db:
+            query = select(ConversationCheckpoint.checkpoint_id).where(
+                ConversationCheckpoint.thread_id == thread_id,
+                ConversationCheckpoint.checkpoint_ns == checkpoint_ns,
+            )
+            if checkpoint_id:
+                query = query.where(
+                    ConversationCheckpoint.checkpoint_id == checkpoint_id
+                )
+            else:
+                query = query.order_by(
+                    ConversationCheckpoint.checkpoint_id.desc()
+                ).limit(1)
+            found_id = (await db.execute(query)).scalar()
+            if found_id is None:
+                self._cache.pop(key, None)
+                return None
+
+            pending_writes = await self._load_writes(
+                db, thread_id, checkpoint_ns, found_id
+            )
+
+            cached = self._cache.get(key)
+            if cached is not None and get_checkpoint_id(cached.config) == found_id:
+                self.hits += 1
+                self._cache.move_to_end(key)
+                return cached._replace(
+                    checkpoint=copy_checkpoint(cached.checkpoint),
+                    pending_writes=pending_writes,
+                )
+
+            self.misses += 1
+            row = await db.get(
+                ConversationCheckpoint, (thread_id, checkpoint_ns, found_id)
+            )
+            checkpoint_tuple = self._to_tuple(row, pending_writes)
+            if not checkpoint_id:
+                self._remember(key, checkpoint_tuple)
+            return checkpoint_tuple
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        query = select(ConversationCheckpoint)
+        if config is not None:
+            configurable = config["configurable"]
+            query = query.where(
+                ConversationCheckpoint.thread_id == configurable["thread_id"]
+            )
+            if "checkpoint_ns" in configurable:
+                query = query.where(
+                    ConversationCheckpoint.checkpoint_ns
+                    == configurable["checkpoint_ns"]
+                )
+            if checkpoint_id := get_checkpoint_id(config):
+                query = query.where(
+                    ConversationCheckpoint.checkpoint_id == checkpoint_id
+                )
+        if before is not None and (before_id := get_checkpoint_id(before)):
+            query = query.where(ConversationCheckpoint.checkpoint_id < before_id)
+        query = query.order_by(ConversationCheckpoint.checkpoint_id.desc())
+
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(query)).scalars().all()
+            returned = 0
+            for row in rows:
+                if limit is not None and returned >= limit:
+                    return
+                checkpoint_tuple = self._to_tuple(
+                    row,
+                    await self._load_writes(
+                        db, row.thread_id, row.checkpoint_ns, row.checkpoint_id
+                    ),
+                )
+                if filter and any(
+                    checkpoint_tuple.metadata.get(k) != v for k, v in filter.items()
+                ):
+                    continue
+                returned += 1
+                yield checkpoint_tuple
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        parent_checkpoint_id = config["configurable"].get("checkpoint_id")
+        metadata = get_checkpoint_metadata(config, metadata)
+        checkpoint_type, checkpoint_blob = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_blob = self.serde.dumps_typed(metadata)
+
+        async with AsyncSessionLocal() as db:
+            await db.merge(
+                ConversationCheckpoint(
+                    thread_id=thread_id,
+                    checkpoint_ns=checkpoint_ns,
+                    checkpoint_id=checkpoint["id"],
+                    parent_checkpoint_id=parent_checkpoint_id,
+                    checkpoint_type=checkpoint_type,
+                    checkpoint=checkpoint_blob,
+                    metadata_type=metadata_type,
+                    checkpoint_metadata=metadata_blob,
+                )
+            )
+            await self._compact(db, thread_id, checkpoint_ns)
+            await db.commit()
+
+        next_config = _thread_config(thread_id, checkpoint_ns, checkpoint["id"])
+        self._remember(
+            (thread_id, checkpoint_ns),
+            CheckpointTuple(
+                config=next_config,
+                checkpoint=copy_checkpoint(checkpoint),
+                metadata=metadata,
+                parent_config=(
+                    _thread_config(thread_id, checkpoint_ns, parent_checkpoint_id)
+                    if parent_checkpoint_id
+                    else None
+                ),
+            ),
+        )
+        return next_config
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+
+        async with AsyncSessionLocal() as db:
+            for idx, (channel, value) in enumerate(writes):
+                write_idx = WRITES_IDX_MAP.get(channel, idx)
+                key = (thread_id, checkpoint_ns, checkpoint_id, task_id, write_idx)
+                # Regular writes are only recorded once per task; special
+                # channels (errors, interrupts) overwrite the previous value.
+                if write_idx >= 0 and await db.get(ConversationCheckpointWrite, key):
+                    continue
+                value_type, value_blob = self.serde.dumps_typed(value)
+                await db.merge(
+                    ConversationCheckpointWrite(
+                        thread_id=thread_id,
+                        checkpoint_ns=checkpoint_ns,
+                        checkpoint_id=checkpoint_id,
+                        task_id=task_id,
+                        idx=write_idx,
+                        channel=channel,
+                        value_type=value_type,
+                        value=value_blob,
+                        task_path=task_path,
+                    )
+                )
+            await db.commit()
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                delete(ConversationCheckpoint).where(
+                    ConversationCheckpoint.thread_id == thread_id
+                )
+            )
+            await db.execute(
+                delete(ConversationCheckpointWrite).where(
+                    ConversationCheckpointWrite.thread_id == thread_id
+                )
+            )
+            await db.commit()
+        for key in [k for k in self._cache if k[0] == thread_id]:
+            del self._cache[key]
+
+    async def _compact(self, db, thread_id: str, checkpoint_ns: str) -> None:
+        """Delete all but the newest ``keep_per_thread`` checkpoints of a thread."""
+        oldest_kept = (
+            await db.execute(
+                select(ConversationCheckpoint.checkpoint_id)
+                .where(
+                    ConversationCheckpoint.thread_id == thread_id,
+                    ConversationCheckpoint.checkpoint_ns == checkpoint_ns,
+                )
+                .order_by(ConversationCheckpoint.checkpoint_id.desc())
+                .offset(self.keep_per_thread - 1)
+                .limit(1)
+            )
+        ).scalar()
+        if oldest_kept is None:
+            return
+        for model in (ConversationCheckpoint, ConversationCheckpointWrite):
+            await db.execute(
+                delete(model).where(
+                    model.thread_id == thread_id,
+                    model.checkpoint_ns == checkpoint_ns,
+                    model.checkpoint_id < oldest_kept,
+                )
+            )
+
+    async def prune(self) -> None:
+        """Delete checkpoints and writes older than the retention period."""
+        cutoff = datetime.datetime.utcnow() - datetime.timedelta(
+            days=self.retention_days
+        )
+        async with AsyncSessionLocal() as db:
+            for model in (ConversationCheckpoint, ConversationCheckpointWrite):
+                await db.execute(delete(model).where(model.created_at < cutoff))
+            await db.commit()
+
+    async def _prune_forever(self) -> None:
+        while True:
+            try:
+                await self.prune()
+            except Exception as e:
+                print(f"Failed to prune conversation checkpoints: {e}")
+            await asyncio.sleep(CHECKPOINT_PRUNE_INTERVAL)
+
+    def start_pruning(self) -> None:
+        if self._prune_task is None or self._prune_task.done():
+            self._prune_task = asyncio.create_task(self._prune_forever())
+
+    def stop_pruning(self) -> None:
+        if self._prune_task is not None:
+            self._prune_task.cancel()
+            self._prune_task = None
+
+    def stats(self) -> dict:
+        return {
+            "cached_threads": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+checkpointer = SQLAlchemyCheckpointSaver()
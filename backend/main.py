@@ -1,6 +1,9 @@
+from checkpointer import checkpointer
 from database import Base, engine
 from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from mcp_client import close_pools
+from mcp_registry import tool_registry
 from mcp_routes import router as mcp_router
 
 from auth.auth import authenticate
@@ -17,6 +20,14 @@ app = FastAPI(
 async def startup():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    # Discover MCP tools up front so the first chat request doesn't pay for it.
+    tool_registry.warm()
+    checkpointer.start_pruning()
+
+@app.on_event("shutdown")
+async def shutdown():
+    checkpointer.stop_pruning()
+    await close_pools()
 
 # Include auth routes
 app.include_router(auth_router)
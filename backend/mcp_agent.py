@@ -1,34 +1,42 @@
+import hashlib
+import json
 import os
 import re
+from collections import OrderedDict
 from typing import Any
 
+from checkpointer import checkpointer
 from langchain.agents import create_agent
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import BaseTool, StructuredTool
-from langchain_mcp_adapters.tools import load_mcp_tools
 from langchain_openai import ChatOpenAI
-from langgraph.checkpoint.memory import MemorySaver
+from mcp_client import SERVER_URLS
+from mcp_registry import tool_registry
 from models import OAuthToken
 from pydantic import BaseModel, Field, create_model
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from tool_cache import BYPASS_CACHE_ARG, is_cacheable
 
 from auth.oauth import refresh_google_token
+from chat.history import ConversationCompactionMiddleware
 
-_CHECKPOINTER = MemorySaver()
+# Run config key holding the requesting user's OAuth tokens by provider. The
+# value is a dict, so LangGraph never copies it into checkpoint metadata.
+OAUTH_TOKENS_KEY = "oauth_tokens"
 
+# Upper bound on memoized token-free tool schemas (see _strip_token_from_tool).
+MCP_SCHEMA_CACHE_SIZE = int(os.getenv("MCP_SCHEMA_CACHE_SIZE", "256"))
+_STRIPPED_TOOLS: OrderedDict[str, tuple[type[BaseModel], str]] = OrderedDict()
 
-# Define URLs
-MCP_GOOGLE_DRIVE_URL = os.getenv(
-    "MCP_GOOGLE_DRIVE_URL",
-    "http://mcp-google-drive:8080/sse",
-)
-MCP_GITHUB_URL = os.getenv("MCP_GITHUB_URL", "http://mcp-github:8080/sse")
-MCP_SLACK_URL = os.getenv("MCP_SLACK_URL", "http://mcp-slack:8080/sse")
+_LLM: ChatOpenAI | None = None
+_AGENTS: dict[tuple[int, frozenset[str]], Any] = {}
 
-SERVER_URLS = {
-    "google_drive": MCP_GOOGLE_DRIVE_URL,
-    "github": MCP_GITHUB_URL,
-    "slack": MCP_SLACK_URL,
+
+SERVER_LABELS: dict[str, str] = {
+    "google_drive": "Google Drive",
+    "github": "GitHub",
+    "slack": "Slack",
 }
 
 PROVIDER_BY_SERVER: dict[str, str] = {
@@ -99,7 +107,7 @@ def _provider_from_tool_name(tool_name: str) -> str | None:
     return None
 
 
-async def _load_user_access_tokens(db: AsyncSession, user_id: int) -> dict[str, str]:
+async def load_user_access_tokens(db: AsyncSession, user_id: int) -> dict[str, str]:
     result = await db.execute(select(OAuthToken).where(OAuthToken.user_id == user_id))
     records = list(result.scalars().all())
     by_provider = {r.provider: r for r in records}
@@ -116,31 +124,47 @@ async def _load_user_access_tokens(db: AsyncSession, user_id: int) -> dict[str,
     return tokens
 
 
+_TOKEN_LINE = re.compile(r"^\s*token:", re.IGNORECASE)
+
+
 def _clean_description(description: str) -> str:
     """Remove references to 'token' argument from tool description."""
     if not description:
         return description
     # Remove lines that mention 'token:' as a parameter
     lines = description.split("\n")
-    cleaned_lines = [
-        line for line in lines
-        if not re.match(r"^\s*token:", line, re.IGNORECASE)
-    ]
+    cleaned_lines = [line for line in lines if not _TOKEN_LINE.match(line)]
     return "\n".join(cleaned_lines)
 
 
-def _wrap_tool_with_db_token(
-    tool: BaseTool,
-    *,
-    provider: str,
-    tokens_by_provider: dict[str, str],
-) -> BaseTool:
-    """Wrap a tool to auto-inject the user's OAuth token, hiding it from the LLM."""
-    schema = getattr(tool, "args_schema", None)
+def _is_cacheable_tool(tool: BaseTool) -> bool:
+    metadata = tool.metadata or {}
+    return is_cacheable(metadata.get("mcp_server", ""), metadata.get("mcp_tool", ""))
 
-    # Only wrap tools that have a `token` arg
-    if not _schema_has_token(schema):
-        return tool
+
+def _tool_fingerprint(tool: BaseTool, schema: Any) -> str:
+    if not isinstance(schema, dict):
+        schema = schema.model_json_schema()
+    payload = json.dumps(
+        [tool.name, schema, tool.description or "", _is_cacheable_tool(tool)],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _strip_token_from_tool(tool: BaseTool) -> tuple[type[BaseModel], str]:
+    """Return the token-free args model and cleaned description for a tool.
+
+    Results are memoized by a hash of the tool's name, schema and description,
+    so re-wrapping an unchanged tool reuses the model class built last time.
+    """
+    schema = tool.args_schema
+    key = _tool_fingerprint(tool, schema)
+    cached = _STRIPPED_TOOLS.get(key)
+    if cached is not None:
+        _STRIPPED_TOOLS.move_to_end(key)
+        return cached
 
     # Build a new schema without the 'token' field
     if isinstance(schema, dict):
@@ -156,10 +180,51 @@ def _wrap_tool_with_db_token(
         }
         new_schema = create_model(f"{schema.__name__}NoToken", **field_definitions)
 
+    # Let the LLM ask for fresh data when a cached result may be outdated
+    if _is_cacheable_tool(tool):
+        new_schema = create_model(
+            new_schema.__name__,
+            __base__=new_schema,
+            **{
+                BYPASS_CACHE_ARG: (
+                    bool,
+                    Field(
+                        default=False,
+                        description=(
+                            "Results may be served from a short-lived cache. "
+                            "Set to true to fetch fresh data, e.g. right after "
+                            "something changed."
+                        ),
+                    ),
+                )
+            },
+        )
+
     # Clean the description to remove token references
     cleaned_description = _clean_description(tool.description or "")
 
-    async def call_with_token(**arguments: Any):
+    _STRIPPED_TOOLS[key] = (new_schema, cleaned_description)
+    if len(_STRIPPED_TOOLS) > MCP_SCHEMA_CACHE_SIZE:
+        _STRIPPED_TOOLS.popitem(last=False)
+    return new_schema, cleaned_description
+
+
+def _wrap_tool_with_db_token(tool: BaseTool, *, provider: str) -> BaseTool:
+    """Wrap a tool to auto-inject the user's OAuth token, hiding it from the LLM.
+
+    The token is looked up at call time from the run config (see
+    ``create_agent_config``), so the wrapped tool can be shared by every user.
+    """
+    schema = getattr(tool, "args_schema", None)
+
+    # Only wrap tools that have a `token` arg
+    if not _schema_has_token(schema):
+        return tool
+
+    new_schema, cleaned_description = _strip_token_from_tool(tool)
+
+    async def call_with_token(config: RunnableConfig, **arguments: Any):
+        tokens_by_provider = config.get("configurable", {}).get(OAUTH_TOKENS_KEY, {})
         access_token = tokens_by_provider.get(provider)
         if not access_token:
             return (
@@ -168,7 +233,9 @@ def _wrap_tool_with_db_token(
             )
         merged = dict(arguments)
         merged["token"] = access_token
-        return await tool.ainvoke(merged)
+        # Call the coroutine directly: tool.ainvoke would start a nested run
+        # that reports these arguments, token included, to the run's callbacks.
+        return await tool.coroutine(**merged)
 
     return StructuredTool(
         name=tool.name,
@@ -178,41 +245,24 @@ def _wrap_tool_with_db_token(
     )
 
 
-async def create_mcp_agent(*, user_id: int, db: AsyncSession):
-    # Load tokens once per request so tool calls don't leak tokens to the LLM
-    # and to avoid AsyncSession concurrency issues if tools run in parallel.
-    tokens_by_provider = await _load_user_access_tokens(db, user_id)
-
+def _build_agent(tools_by_server: dict[str, list[BaseTool]]):
     all_tools: list[BaseTool] = []
-    for server_name, url in SERVER_URLS.items():
-        try:
-            tools = await load_mcp_tools(
-                session=None,
-                connection={"transport": "sse", "url": url},
-                server_name=server_name,
-                tool_name_prefix=True,
-            )
-
-            for tool in tools:
-                provider = _provider_from_tool_name(tool.name)
-                if provider is None:
-                    all_tools.append(tool)
-                else:
-                    all_tools.append(
-                        _wrap_tool_with_db_token(
-                            tool,
-                            provider=provider,
-                            tokens_by_provider=tokens_by_provider,
-                        )
-                    )
-        except Exception as e:
-            print(f"Failed to load tools from {server_name}: {e}")
+    for tools in tools_by_server.values():
+        for tool in tools:
+            provider = _provider_from_tool_name(tool.name)
+            if provider is None:
+                all_tools.append(tool)
+            else:
+                all_tools.append(_wrap_tool_with_db_token(tool, provider=provider))
 
     if not all_tools:
         print("Warning: No tools found from any MCP server.")
 
-    model_name = os.getenv("OPENAI_MODEL", "gpt-5-mini")
-    llm = ChatOpenAI(model=model_name, temperature=0)
+    unavailable = [
+        SERVER_LABELS[server_name]
+        for server_name in SERVER_URLS
+        if server_name not in tools_by_server
+    ]
 
     prompt = (
         "You are a helpful assistant that can access Google Drive, GitHub, and Slack. "
@@ -220,11 +270,58 @@ async def create_mcp_agent(*, user_id: int, db: AsyncSession):
         "Only ask for clarifying information if necessary, make assumptions otherwise. "
         "Never ask the user for OAuth tokens; authentication is handled server-side."
     )
+    if unavailable:
+        prompt += (
+            f" The following connectors are temporarily unavailable: "
+            f"{', '.join(unavailable)}. If the request needs them, tell the user "
+            "to try again shortly."
+        )
 
-    agent = create_agent(
+    llm = _get_llm()
+    return create_agent(
         llm,
         all_tools,
         system_prompt=prompt,
-        checkpointer=_CHECKPOINTER,
+        middleware=[ConversationCompactionMiddleware(llm)],
+        checkpointer=checkpointer,
     )
+
+
+def _get_llm() -> ChatOpenAI:
+    global _LLM
+    if _LLM is None:
+        model_name = os.getenv("OPENAI_MODEL", "gpt-5-mini")
+        _LLM = ChatOpenAI(model=model_name, temperature=0)
+    return _LLM
+
+
+async def create_mcp_agent():
+    """Return the compiled agent for the MCP servers that are currently available.
+
+    Agents are compiled once per tool registry version and set of available
+    servers and reused across requests; per-user state travels in the run
+    config built by ``create_agent_config``.
+    """
+    tools_by_server = await tool_registry.get_tools()
+    key = (tool_registry.version, frozenset(tools_by_server))
+    agent = _AGENTS.get(key)
+    if agent is None:
+        # Agents compiled against an older tool set are never used again.
+        for stale_key in [k for k in _AGENTS if k[0] != tool_registry.version]:
+            del _AGENTS[stale_key]
+        agent = _AGENTS[key] = _build_agent(tools_by_server)
     return agent
+
+
+async def create_agent_config(
+    *, user_id: int, db: AsyncSession, thread_id: str
+) -> RunnableConfig:
+    # Load tokens once per request so tool calls don't leak tokens to the LLM
+    # and to avoid AsyncSession concurrency issues if tools run in parallel.
+    tokens_by_provider = await load_user_access_tokens(db, user_id)
+    return {
+        "configurable": {
+            "thread_id": thread_id,
+            OAUTH_TOKENS_KEY: tokens_by_provider,
+        }
+    }
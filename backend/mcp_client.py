@@ -1,6 +1,12 @@
+import asyncio
 import os
+import time
 
+import anyio
 from mcp.client.sse import sse_client
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED, ServerNotification
+from tool_cache import looks_like_error, tool_cache
 
 from mcp import ClientSession
 
@@ -9,56 +15,337 @@ MCP_GOOGLE_DRIVE_URL = os.getenv("MCP_GOOGLE_DRIVE_URL", "http://mcp-google-driv
 MCP_GITHUB_URL = os.getenv("MCP_GITHUB_URL", "http://mcp-github:8080/sse")
 MCP_SLACK_URL = os.getenv("MCP_SLACK_URL", "http://mcp-slack:8080/sse")
 
-async def call_google_drive_tool(tool_name: str, arguments: dict):
+SERVER_URLS = {
+    "google_drive": MCP_GOOGLE_DRIVE_URL,
+    "github": MCP_GITHUB_URL,
+    "slack": MCP_SLACK_URL,
+}
+
+# Session pool settings. Each MCP server gets up to MCP_POOL_SIZE long-lived,
+# initialized sessions; concurrent tool calls are multiplexed over them.
+MCP_POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "4"))
+# Sessions idle for longer than this are pinged before reuse and replaced if
+# the ping fails.
+MCP_POOL_IDLE_TIMEOUT = float(os.getenv("MCP_POOL_IDLE_TIMEOUT", "60"))
+MCP_CONNECT_TIMEOUT = float(os.getenv("MCP_CONNECT_TIMEOUT", "10"))
+
+_CONNECTION_ERRORS = (
+    anyio.ClosedResourceError,
+    anyio.BrokenResourceError,
+    anyio.EndOfStream,
+    ConnectionError,
+)
+
+
+def _is_connection_error(error: BaseException) -> bool:
+    if isinstance(error, McpError):
+        return error.error.code == CONNECTION_CLOSED
+    return isinstance(error, _CONNECTION_ERRORS)
+
+
+class _PooledConnection:
+    """A single initialized MCP session kept open by a background task.
+
+    The SSE transport and the session are async context managers that must be
+    entered and exited from the same task, so a dedicated task owns them and
+    stays parked until the connection is closed.
+    """
+
+    def __init__(self, url: str, on_notification=None):
+        self.url = url
+        self.on_notification = on_notification
+        self.session: ClientSession | None = None
+        self.in_flight = 0
+        self.last_used = time.monotonic()
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._error: BaseException | None = None
+
+    @property
+    def alive(self) -> bool:
+        return self.session is not None and not self._closing.is_set()
+
+    async def open(self) -> None:
+        self._task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._ready.wait(), MCP_CONNECT_TIMEOUT)
+        except TimeoutError:
+            await self.close()
+            raise ConnectionError(
+                f"Timed out connecting to MCP server at {self.url}"
+            ) from None
+        if self.session is None:
+            raise ConnectionError(
+                f"Could not connect to MCP server at {self.url}: {self._error}"
+            ) from self._error
+
+    async def _run(self) -> None:
+        try:
+            async with sse_client(self.url) as (read_stream, write_stream):
+                async with ClientSession(
+                    read_stream,
+                    write_stream,
+                    message_handler=self._handle_message,
+                ) as session:
+                    await session.initialize()
+                    self.session = session
+                    self._ready.set()
+                    await self._closing.wait()
+        except Exception as e:
+            self._error = e
+        finally:
+            self.session = None
+            self._ready.set()
+
+    async def _handle_message(self, message) -> None:
+        # Transport errors are delivered to the session as exceptions; treat
+        # them as fatal so the pool stops handing this connection out.
+        if isinstance(message, Exception):
+            print(f"MCP connection to {self.url} failed: {message}")
+            self._closing.set()
+        elif isinstance(message, ServerNotification) and self.on_notification:
+            self.on_notification(message)
+
+    async def ping(self) -> bool:
+        session = self.session
+        if session is None:
+            return False
+        try:
+            await asyncio.wait_for(session.send_ping(), MCP_CONNECT_TIMEOUT)
+            return True
+        except Exception:
+            return False
+
+    async def close(self) -> None:
+        self._closing.set()
+        if self._task is None or self._task.done():
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), MCP_CONNECT_TIMEOUT)
+        except Exception:
+            self._task.cancel()
+
+
+class MCPSessionPool:
+    """Warm, shared MCP sessions for one server URL.
+
+    MCP sessions multiplex requests by id, so a session is not checked out
+    exclusively: each call goes to the least busy live session, and a new one
+    is opened only while every existing session is busy and the pool is below
+    its size limit.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        *,
+        size: int = MCP_POOL_SIZE,
+        idle_timeout: float = MCP_POOL_IDLE_TIMEOUT,
+    ):
+        self.url = url
+        self.size = max(1, size)
+        self.idle_timeout = idle_timeout
+        self._connections: list[_PooledConnection] = []
+        # Connections being opened, which count against the size limit.
+        self._opening = 0
+        self._lock = asyncio.Lock()
+        # Notified when a connection is opened or dropped.
+        self._changed = asyncio.Condition(self._lock)
+        self._listeners = []
+
+    def add_notification_listener(self, listener) -> None:
+        """Call ``listener(notification)`` for server notifications."""
+        self._listeners.append(listener)
+
+    def _notify(self, notification: ServerNotification) -> None:
+        for listener in self._listeners:
+            listener(notification)
+
+    def _least_busy(self) -> _PooledConnection | None:
+        return min(self._connections, key=lambda c: c.in_flight, default=None)
+
+    def _has_room(self) -> bool:
+        return len(self._connections) + self._opening < self.size
+
+    async def _acquire(self) -> _PooledConnection:
+        # Opening and pinging take a network round trip, so they happen
+        # outside the lock: the lock only picks a connection and reserves it,
+        # or reserves a slot for a new one.
+        while True:
+            async with self._changed:
+                dead = []
+                while True:
+                    dead += [c for c in self._connections if not c.alive]
+                    self._connections = [c for c in self._connections if c.alive]
+                    conn = self._least_busy()
+                    if conn is not None or self._has_room():
+                        break
+                    # Every slot is taken by a connection that is still opening.
+                    await self._changed.wait()
+
+                check = False
+                if conn is None or (conn.in_flight > 0 and self._has_room()):
+                    conn = None
+                    self._opening += 1
+                else:
+                    idle_for = time.monotonic() - conn.last_used
+                    check = conn.in_flight == 0 and idle_for > self.idle_timeout
+                    conn.in_flight += 1
+
+            for stale in dead:
+                await stale.close()
+
+            if conn is None:
+                return await self._open()
+            if check and not await conn.ping():
+                conn.in_flight -= 1
+                await self._discard(conn)
+                continue
+            return conn
+
+    async def _open(self) -> _PooledConnection:
+        """Open a connection in a reserved slot and publish it, reserved."""
+        conn = _PooledConnection(self.url, on_notification=self._notify)
+        opened = False
+        try:
+            await conn.open()
+            opened = True
+        finally:
+            async with self._changed:
+                self._opening -= 1
+                if opened:
+                    conn.in_flight += 1
+                    self._connections.append(conn)
+                self._changed.notify_all()
+        return conn
+
+    def _release(self, conn: _PooledConnection) -> None:
+        conn.in_flight -= 1
+        conn.last_used = time.monotonic()
+
+    async def _discard(self, conn: _PooledConnection) -> None:
+        async with self._changed:
+            if conn in self._connections:
+                self._connections.remove(conn)
+            self._changed.notify_all()
+        await conn.close()
+
+    async def run(self, operation):
+        """Run ``operation(session)`` on a pooled session.
+
+        A call that fails because the connection went away is retried once on
+        a fresh session.
+        """
+        for attempt in range(2):
+            conn = await self._acquire()
+            try:
+                session = conn.session
+                if session is None:
+                    raise ConnectionError(f"MCP connection to {self.url} closed")
+                return await operation(session)
+            except Exception as e:
+                if not _is_connection_error(e):
+                    raise
+                await self._discard(conn)
+                if attempt:
+                    raise
+            finally:
+                self._release(conn)
+
+    async def call_tool(self, tool_name: str, arguments: dict):
+        return await self.run(
+            lambda session: session.call_tool(tool_name, arguments=arguments)
+        )
+
+    async def close(self) -> None:
+        async with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            await conn.close()
+
+    def stats(self) -> dict:
+        return {
+            "url": self.url,
+            "size": self.size,
+            "connections": len(self._connections),
+            "opening": self._opening,
+            "in_flight": sum(c.in_flight for c in self._connections),
+        }
+
+
+_POOLS: dict[str, MCPSessionPool] = {}
+
+
+def get_pool(url: str) -> MCPSessionPool:
+    pool = _POOLS.get(url)
+    if pool is None:
+        pool = _POOLS[url] = MCPSessionPool(url)
+    return pool
+
+
+def pool_stats() -> list[dict]:
+    return [pool.stats() for pool in _POOLS.values()]
+
+
+async def close_pools() -> None:
+    pools = list(_POOLS.values())
+    _POOLS.clear()
+    for pool in pools:
+        await pool.close()
+
+
+class MCPToolError(Exception):
+    """A tool call that failed, either on the way to the server or in the tool."""
+
+
+async def call_mcp_tool(
+    server_name: str,
+    tool_name: str,
+    arguments: dict,
+    *,
+    use_cache: bool = True,
+    raise_errors: bool = False,
+):
+    """Call a tool and return its text output.
+
+    Failures come back as error text, which is what the agent shows the model.
+    With ``raise_errors`` they raise MCPToolError instead.
+    """
+    if use_cache:
+        cached = tool_cache.get(server_name, tool_name, arguments)
+        if cached is not None:
+            return cached
+
     try:
-        async with sse_client(MCP_GOOGLE_DRIVE_URL) as (read_stream, write_stream):
-            async with ClientSession(read_stream, write_stream) as session:
-                await session.initialize()
-                
-                # Call the tool
-                result = await session.call_tool(tool_name, arguments=arguments)
-                
-                # Result is a CallToolResult object
-                if result.content and len(result.content) > 0:
-                    return result.content[0].text
-                return "No output from tool."
+        result = await get_pool(SERVER_URLS[server_name]).call_tool(
+            tool_name, arguments
+        )
+        # Result is a CallToolResult object
+        if not result.content:
+            return "No output from tool."
+        text = result.content[0].text
     except Exception as e:
         print(f"Error calling MCP tool {tool_name}: {e}")
+        if raise_errors:
+            raise MCPToolError(str(e)) from e
         return f"Error: {str(e)}"
 
+    if result.isError or looks_like_error(text):
+        if raise_errors:
+            raise MCPToolError(text)
+    else:
+        tool_cache.put(server_name, tool_name, arguments, text)
+    return text
+
+async def call_google_drive_tool(tool_name: str, arguments: dict):
+    return await call_mcp_tool("google_drive", tool_name, arguments)
+
 async def call_github_tool(tool_name: str, arguments: dict):
-    try:
-        async with sse_client(MCP_GITHUB_URL) as (read_stream, write_stream):
-            async with ClientSession(read_stream, write_stream) as session:
-                await session.initialize()
-                
-                # Call the tool
-                result = await session.call_tool(tool_name, arguments=arguments)
-                
-                # Result is a CallToolResult object
-                if result.content and len(result.content) > 0:
-                    return result.content[0].text
-                return "No output from tool."
-    except Exception as e:
-        print(f"Error calling MCP tool {tool_name}: {e}")
-        return f"Error: {str(e)}"
+    return await call_mcp_tool("github", tool_name, arguments)
 
 async def call_slack_tool(tool_name: str, arguments: dict):
-    try:
-        async with sse_client(MCP_SLACK_URL) as (read_stream, write_stream):
-            async with ClientSession(read_stream, write_stream) as session:
-                await session.initialize()
-                
-                # Call the tool
-                result = await session.call_tool(tool_name, arguments=arguments)
-                
-                # Result is a CallToolResult object
-                if result.content and len(result.content) > 0:
-                    return result.content[0].text
-                return "No output from tool."
-    except Exception as e:
-        print(f"Error calling MCP tool {tool_name}: {e}")
-        return f"Error: {str(e)}"
+    return await call_mcp_tool("slack", tool_name, arguments)
 
 async def list_google_drive_files(token: str, folder_id: str = 'root'):
     return await call_google_drive_tool(
@@ -78,6 +365,12 @@ async def read_google_drive_file(token: str, file_id: str):
         {"token": token, "file_id": file_id},
     )
 
+async def read_google_drive_files(token: str, file_ids: list[str]):
+    return await call_google_drive_tool(
+        "read_files",
+        {"token": token, "file_ids": file_ids},
+    )
+
 # GitHub Tools
 async def list_github_repos(token: str):
     return await call_github_tool("list_repos", {"token": token})
@@ -119,6 +412,12 @@ async def get_github_file_content(
         args["ref"] = ref
     return await call_github_tool("get_file_content", args)
 
+async def get_github_repo_overview(token: str, repo_full_name: str):
+    return await call_github_tool(
+        "repo_overview",
+        {"token": token, "repo_full_name": repo_full_name},
+    )
+
 # Slack Tools
 async def list_slack_channels(token: str):
     return await call_slack_tool("list_channels", {"token": token})
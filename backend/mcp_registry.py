@@ -0,0 +1,210 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass, field
+
+from langchain_core.tools import BaseTool, StructuredTool
+from mcp.types import ServerNotification, Tool, ToolListChangedNotification
+from mcp_client import SERVER_URLS, call_mcp_tool, get_pool
+from tool_cache import BYPASS_CACHE_ARG
+
+# Discovered tool schemas are served from memory and re-listed in the
+# background once they are older than this many seconds.
+MCP_TOOLS_TTL = float(os.getenv("MCP_TOOLS_TTL", "300"))
+# How long a chat request waits for a server whose tools are not cached yet.
+# Servers that miss the deadline are skipped for that request.
+MCP_DISCOVERY_TIMEOUT = float(os.getenv("MCP_DISCOVERY_TIMEOUT", "3"))
+# After a failed discovery, requests stop waiting on that server for this
+# many seconds and a retry happens in the background instead.
+MCP_DISCOVERY_RETRY_INTERVAL = float(os.getenv("MCP_DISCOVERY_RETRY_INTERVAL", "30"))
+
+
+@dataclass
+class _ServerTools:
+    tools: list[BaseTool]
+    schema_hash: str
+    loaded_at: float = field(default_factory=time.monotonic)
+
+
+def _schema_hash(tools: list[Tool]) -> str:
+    payload = json.dumps(
+        [tool.model_dump(mode="json", exclude_none=True) for tool in tools],
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _to_langchain_tool(server_name: str, tool: Tool) -> BaseTool:
+    """Expose an MCP tool to LangChain, calling it through the session pool.
+
+    Tools are named ``{server_name}_{tool.name}`` so the agent can tell the
+    connectors apart.
+    """
+
+    async def call_tool(**arguments):
+        bypass_cache = arguments.pop(BYPASS_CACHE_ARG, False)
+        return await call_mcp_tool(
+            server_name, tool.name, arguments, use_cache=not bypass_cache
+        )
+
+    return StructuredTool(
+        name=f"{server_name}_{tool.name}",
+        description=tool.description or "",
+        args_schema=tool.inputSchema,
+        coroutine=call_tool,
+        metadata={"mcp_server": server_name, "mcp_tool": tool.name},
+    )
+
+
+async def _list_all_tools(server_name: str) -> list[Tool]:
+    async def list_tools(session) -> list[Tool]:
+        tools: list[Tool] = []
+        cursor = None
+        while True:
+            result = await session.list_tools(cursor=cursor)
+            tools.extend(result.tools)
+            cursor = result.nextCursor
+            if not cursor:
+                return tools
+
+    return await get_pool(SERVER_URLS[server_name]).run(list_tools)
+
+
+class MCPToolRegistry:
+    """Process-wide cache of the tools exposed by each MCP server.
+
+    Tools are discovered once and served from memory afterwards. Entries older
+    than the TTL, or invalidated by a ``tools/list_changed`` notification, are
+    refreshed in the background while the cached tools keep being served. A
+    refresh only rebuilds the LangChain tools when the schema hash changes.
+    """
+
+    def __init__(
+        self,
+        server_urls: dict[str, str],
+        *,
+        ttl: float = MCP_TOOLS_TTL,
+        discovery_timeout: float = MCP_DISCOVERY_TIMEOUT,
+        retry_interval: float = MCP_DISCOVERY_RETRY_INTERVAL,
+    ):
+        self.server_urls = server_urls
+        self.ttl = ttl
+        self.discovery_timeout = discovery_timeout
+        self.retry_interval = retry_interval
+        self.version = 0
+        self._entries: dict[str, _ServerTools] = {}
+        self._failed_at: dict[str, float] = {}
+        self._stale: set[str] = set()
+        self._refreshing: dict[str, asyncio.Task] = {}
+        self._listening = False
+
+    def _listen_for_changes(self) -> None:
+        if self._listening:
+            return
+        self._listening = True
+        for server_name, url in self.server_urls.items():
+            get_pool(url).add_notification_listener(
+                lambda notification, name=server_name: self._on_notification(
+                    name, notification
+                )
+            )
+
+    def _on_notification(
+        self, server_name: str, notification: ServerNotification
+    ) -> None:
+        if isinstance(notification.root, ToolListChangedNotification):
+            self._stale.add(server_name)
+
+    async def refresh(self, server_name: str) -> None:
+        self._listen_for_changes()
+        tools = await _list_all_tools(server_name)
+        schema_hash = _schema_hash(tools)
+        self._stale.discard(server_name)
+
+        entry = self._entries.get(server_name)
+        if entry is not None and entry.schema_hash == schema_hash:
+            entry.loaded_at = time.monotonic()
+            return
+
+        self._entries[server_name] = _ServerTools(
+            tools=[_to_langchain_tool(server_name, tool) for tool in tools],
+            schema_hash=schema_hash,
+        )
+        self.version += 1
+
+    def _refresh_in_background(self, server_name: str) -> asyncio.Task:
+        task = self._refreshing.get(server_name)
+        if task is None or task.done():
+            task = asyncio.create_task(self._refresh_logged(server_name))
+            self._refreshing[server_name] = task
+        return task
+
+    async def _refresh_logged(self, server_name: str) -> None:
+        try:
+            await self.refresh(server_name)
+            self._failed_at.pop(server_name, None)
+        except Exception as e:
+            self._failed_at[server_name] = time.monotonic()
+            print(f"Failed to load tools from {server_name}: {e}")
+
+    def _needs_refresh(self, server_name: str) -> bool:
+        entry = self._entries.get(server_name)
+        if entry is None or server_name in self._stale:
+            return True
+        return time.monotonic() - entry.loaded_at > self.ttl
+
+    def warm(self) -> None:
+        """Start discovering every server's tools without waiting for it."""
+        for server_name in self.server_urls:
+            self._refresh_in_background(server_name)
+
+    def _recently_failed(self, server_name: str) -> bool:
+        failed_at = self._failed_at.get(server_name)
+        return (
+            failed_at is not None
+            and time.monotonic() - failed_at < self.retry_interval
+        )
+
+    async def get_tools(self) -> dict[str, list[BaseTool]]:
+        """Return the cached tools for every server that is available.
+
+        Servers that have never been discovered are loaded concurrently, and
+        this waits at most ``discovery_timeout`` for them; a server that misses
+        the deadline, or failed recently, is left out of the result while its
+        discovery carries on in the background. Expired entries are served
+        as-is and refreshed in the background.
+        """
+        pending = []
+        for server_name in self.server_urls:
+            if server_name in self._entries:
+                if self._needs_refresh(server_name):
+                    self._refresh_in_background(server_name)
+            elif server_name in self._failed_at:
+                if not self._recently_failed(server_name):
+                    self._refresh_in_background(server_name)
+            else:
+                pending.append(self._refresh_in_background(server_name))
+
+        if pending:
+            await asyncio.wait(pending, timeout=self.discovery_timeout)
+
+        return {
+            server_name: entry.tools
+            for server_name, entry in self._entries.items()
+        }
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            server_name: {
+                "tools": len(entry.tools),
+                "schema_hash": entry.schema_hash,
+                "age_seconds": round(now - entry.loaded_at, 1),
+            }
+            for server_name, entry in self._entries.items()
+        }
+
+
+tool_registry = MCPToolRegistry(SERVER_URLS)
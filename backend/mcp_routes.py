@@ -1,22 +1,59 @@
-from typing import Any
+import asyncio
+import json
+import os
+from typing import Any, Literal
 
 from database import get_db
 from fastapi import APIRouter, Depends, HTTPException
-from mcp_client import call_github_tool, call_google_drive_tool, call_slack_tool
+from fastapi.responses import StreamingResponse
+from mcp_agent import PROVIDER_BY_SERVER, SERVER_LABELS, load_user_access_tokens
+from mcp_client import (
+    MCPToolError,
+    call_github_tool,
+    call_google_drive_tool,
+    call_mcp_tool,
+    call_slack_tool,
+    pool_stats,
+)
+from mcp_registry import tool_registry
 from models import OAuthToken, User
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from tool_cache import tool_cache
 
+from auth.deps import get_current_user
 from auth.oauth import refresh_google_token
 
 router = APIRouter(prefix="/mcp", tags=["mcp"])
 
+# Maximum number of tool calls from one batch that run at the same time.
+MCP_BATCH_CONCURRENCY = int(os.getenv("MCP_BATCH_CONCURRENCY", "8"))
+# Maximum number of tool calls accepted in a single batch request.
+MCP_BATCH_MAX_CALLS = int(os.getenv("MCP_BATCH_MAX_CALLS", "100"))
+
+# Batch calls name servers the same way as the single-call endpoints.
+BATCH_SERVERS = {
+    "google-drive": "google_drive",
+    "github": "github",
+    "slack": "slack",
+}
+
 class MCPToolRequest(BaseModel):
     username: str
     tool_name: str
     arguments: dict[str, Any] = {}
 
+class MCPBatchCall(BaseModel):
+    server: Literal["google-drive", "github", "slack"]
+    tool_name: str
+    arguments: dict[str, Any] = {}
+
+class MCPBatchRequest(BaseModel):
+    username: str
+    calls: list[MCPBatchCall]
+    stream: bool = False
+
 @router.post("/google-drive/execute")
 async def execute_tool(request: MCPToolRequest, db: AsyncSession = Depends(get_db)):
     # Get user
@@ -112,3 +149,77 @@ async def execute_slack_tool(
     response = await call_slack_tool(request.tool_name, arguments)
     
     return {"response": response}
+
+@router.post("/batch")
+async def execute_batch(request: MCPBatchRequest, db: AsyncSession = Depends(get_db)):
+    """Run several tool calls for one user in a single request.
+
+    The user and their tokens are resolved once, then the calls run
+    concurrently (at most MCP_BATCH_CONCURRENCY at a time). Each result carries
+    the index of its call, its ``response`` and an ``error``; a call that failed
+    has a null ``response`` and the failure in ``error``. With
+    ``stream`` set, results are sent as NDJSON lines in call order as soon as
+    each one and every call before it has finished.
+    """
+    if len(request.calls) > MCP_BATCH_MAX_CALLS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch may contain at most {MCP_BATCH_MAX_CALLS} calls",
+        )
+
+    result = await db.execute(select(User).where(User.username == request.username))
+    user = result.scalars().first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # Tokens are loaded up front so the calls below never touch the session.
+    tokens_by_provider = await load_user_access_tokens(db, user.id)
+    semaphore = asyncio.Semaphore(max(1, MCP_BATCH_CONCURRENCY))
+
+    async def run_call(index: int, call: MCPBatchCall) -> dict[str, Any]:
+        server_name = BATCH_SERVERS[call.server]
+        token = tokens_by_provider.get(PROVIDER_BY_SERVER[server_name])
+        if not token:
+            return {
+                "index": index,
+                "response": None,
+                "error": f"{SERVER_LABELS[server_name]} not connected",
+            }
+
+        arguments = call.arguments.copy()
+        arguments["token"] = token
+        try:
+            async with semaphore:
+                response = await call_mcp_tool(
+                    server_name, call.tool_name, arguments, raise_errors=True
+                )
+        except MCPToolError as e:
+            return {"index": index, "response": None, "error": str(e)}
+        return {"index": index, "response": response, "error": None}
+
+    tasks = [
+        asyncio.create_task(run_call(index, call))
+        for index, call in enumerate(request.calls)
+    ]
+
+    if not request.stream:
+        return {"results": await asyncio.gather(*tasks)}
+
+    async def ndjson():
+        try:
+            for task in tasks:
+                yield json.dumps(await task, default=str) + "\n"
+        finally:
+            # The client went away; don't keep calling tools for nobody.
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+@router.get("/stats")
+async def mcp_stats(user: User = Depends(get_current_user)):
+    return {
+        "pools": pool_stats(),
+        "tools": tool_registry.stats(),
+        "tool_cache": tool_cache.stats(),
+    }
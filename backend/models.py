@@ -1,6 +1,8 @@
 
+import datetime
+
 from database import Base
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, LargeBinary, String
 from sqlalchemy.orm import relationship
 
 
@@ -24,3 +26,35 @@ class OAuthToken(Base):
     expires_at = Column(DateTime, nullable=True)
     
     user = relationship("User", back_populates="oauth_tokens")
+
+
+class ConversationCheckpoint(Base):
+    """A serialized LangGraph checkpoint for one conversation thread."""
+
+    __tablename__ = "conversation_checkpoints"
+
+    thread_id = Column(String, primary_key=True)
+    checkpoint_ns = Column(String, primary_key=True, default="")
+    checkpoint_id = Column(String, primary_key=True)
+    parent_checkpoint_id = Column(String, nullable=True)
+    checkpoint_type = Column(String)
+    checkpoint = Column(LargeBinary)
+    metadata_type = Column(String)
+    checkpoint_metadata = Column(LargeBinary)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+
+class ConversationCheckpointWrite(Base):
+    """A pending write recorded against a checkpoint by a graph task."""
+
+    __tablename__ = "conversation_checkpoint_writes"
+
+    thread_id = Column(String, primary_key=True)
+    checkpoint_ns = Column(String, primary_key=True, default="")
+    checkpoint_id = Column(String, primary_key=True)
+    task_id = Column(String, primary_key=True)
+    idx = Column(Integer, primary_key=True)
+    channel = Column(String)
+    value_type = Column(String)
+    value = Column(LargeBinary)
+    task_path = Column(String, default="")
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
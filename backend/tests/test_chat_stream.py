@@ -0,0 +1,130 @@
+import asyncio
+import json
+
+from database import get_db
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from langchain.agents import create_agent
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.tools import StructuredTool
+from mcp_agent import OAUTH_TOKENS_KEY, _wrap_tool_with_db_token
+from models import User
+
+import chat.routes as routes
+from auth.deps import get_current_user
+
+SECRET = "SECRET_TOKEN"
+
+
+class ToolCallingModel(GenericFakeChatModel):
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+def list_files_tool(calls: list) -> StructuredTool:
+    """An MCP tool as the registry builds it, recording what it is called with."""
+
+    async def list_files(**arguments):
+        calls.append(arguments)
+        return "file-a, file-b"
+
+    return StructuredTool(
+        name="google_drive_list_files",
+        description="List files.",
+        args_schema={
+            "type": "object",
+            "properties": {
+                "token": {"type": "string"},
+                "folder_id": {"type": "string"},
+            },
+            "required": ["token", "folder_id"],
+        },
+        coroutine=list_files,
+    )
+
+
+def stream(monkeypatch, tool) -> list[tuple[str, dict]]:
+    """POST to /chat/agent/stream with an agent that calls ``tool`` once."""
+    model = ToolCallingModel(
+        disable_streaming=True,
+        messages=iter([
+            AIMessage(
+                "",
+                tool_calls=[
+                    {"name": tool.name, "args": {"folder_id": "abc"}, "id": "1"}
+                ],
+            ),
+            AIMessage("two files"),
+        ]),
+    )
+    agent = create_agent(model, [tool])
+
+    async def create_mcp_agent():
+        return agent
+
+    async def create_agent_config(**kwargs):
+        return {"configurable": {OAUTH_TOKENS_KEY: {"google": SECRET}}}
+
+    monkeypatch.setattr(routes, "create_mcp_agent", create_mcp_agent)
+    monkeypatch.setattr(routes, "create_agent_config", create_agent_config)
+
+    app = FastAPI()
+    app.include_router(routes.router)
+    app.dependency_overrides[get_current_user] = lambda: User(id=1, username="u")
+    app.dependency_overrides[get_db] = lambda: None
+    response = TestClient(app).post("/chat/agent/stream", json={"query": "files?"})
+
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event.removeprefix("event: "), json.loads(data[6:])))
+    return events
+
+
+def test_stream_does_not_leak_the_oauth_token(monkeypatch):
+    calls = []
+    tool = _wrap_tool_with_db_token(list_files_tool(calls), provider="google")
+
+    events = stream(monkeypatch, tool)
+
+    assert calls == [{"folder_id": "abc", "token": SECRET}]
+    assert [event for event, _ in events] == [
+        "start", "tool_start", "tool_end", "final"
+    ]
+    assert events[1][1]["input"] == {"folder_id": "abc"}
+    assert events[2][1]["output"] == "file-a, file-b"
+    assert not any(SECRET in json.dumps(data) for _, data in events)
+
+
+def test_wrapped_tool_does_not_start_a_nested_run():
+    tool = _wrap_tool_with_db_token(list_files_tool([]), provider="google")
+    config = {"configurable": {OAUTH_TOKENS_KEY: {"google": SECRET}}}
+
+    async def events():
+        return [
+            event
+            async for event in tool.astream_events(
+                {"folder_id": "abc"}, config=config, version="v2"
+            )
+        ]
+
+    starts = [e for e in asyncio.run(events()) if e["event"] == "on_tool_start"]
+    assert [e["data"]["input"] for e in starts] == [{"folder_id": "abc"}]
+
+
+def test_stream_skips_runs_nested_in_a_tool(monkeypatch):
+    inner = list_files_tool([])
+
+    async def list_files(folder_id: str) -> str:
+        """List files."""
+        return await inner.ainvoke({"folder_id": folder_id, "token": SECRET})
+
+    tool = StructuredTool.from_function(
+        coroutine=list_files, name="google_drive_list_files"
+    )
+
+    events = stream(monkeypatch, tool)
+
+    assert [event for event, _ in events].count("tool_start") == 1
+    assert not any(SECRET in json.dumps(data) for _, data in events)
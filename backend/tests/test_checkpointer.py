@@ -0,0 +1,169 @@
+import asyncio
+import datetime
+
+import checkpointer as checkpointer_module
+import pytest
+from checkpointer import SQLAlchemyCheckpointSaver
+from database import Base
+from langgraph.checkpoint.base import empty_checkpoint
+from models import ConversationCheckpoint, ConversationCheckpointWrite
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+TABLES = [ConversationCheckpoint.__table__, ConversationCheckpointWrite.__table__]
+
+
+@pytest.fixture
+def run(tmp_path, monkeypatch):
+    """Run a coroutine against a fresh SQLite database."""
+    url = f"sqlite+aiosqlite:///{tmp_path / 'checkpoints.db'}"
+
+    def run(coroutine_function):
+        async def main():
+            engine = create_async_engine(url)
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all, tables=TABLES)
+            monkeypatch.setattr(
+                checkpointer_module,
+                "AsyncSessionLocal",
+                sessionmaker(engine, class_=AsyncSession, expire_on_commit=False),
+            )
+            try:
+                return await coroutine_function()
+            finally:
+                await engine.dispose()
+
+        return asyncio.run(main())
+
+    return run
+
+
+def thread(thread_id: str, checkpoint_id: str | None = None) -> dict:
+    configurable = {"thread_id": thread_id, "checkpoint_ns": ""}
+    if checkpoint_id:
+        configurable["checkpoint_id"] = checkpoint_id
+    return {"configurable": configurable}
+
+
+async def put(saver, config, step: int) -> dict:
+    return await saver.aput(config, empty_checkpoint(), {"step": step}, {})
+
+
+def test_put_and_get_latest(run):
+    async def scenario():
+        saver = SQLAlchemyCheckpointSaver()
+        first = await put(saver, thread("t1"), 1)
+        second = await put(saver, first, 2)
+
+        latest = await saver.aget_tuple(thread("t1"))
+        assert latest.config == second
+        assert latest.metadata["step"] == 2
+        assert latest.parent_config == first
+
+        earlier = await saver.aget_tuple(first)
+        assert earlier.metadata["step"] == 1
+        assert earlier.parent_config is None
+        assert await saver.aget_tuple(thread("missing")) is None
+
+    run(scenario)
+
+
+def test_cache_is_validated_against_the_database(run):
+    async def scenario():
+        saver = SQLAlchemyCheckpointSaver()
+        other_worker = SQLAlchemyCheckpointSaver()
+        first = await put(saver, thread("t1"), 1)
+
+        assert (await saver.aget_tuple(thread("t1"))).config == first
+        assert saver.hits == 1
+
+        second = await put(other_worker, first, 2)
+        latest = await saver.aget_tuple(thread("t1"))
+        assert latest.config == second
+        assert saver.misses == 1
+
+    run(scenario)
+
+
+def test_pending_writes(run):
+    async def scenario():
+        saver = SQLAlchemyCheckpointSaver()
+        config = await put(saver, thread("t1"), 1)
+        await saver.aput_writes(config, [("messages", "a"), ("other", 1)], "task")
+        # Regular writes are only recorded once per task.
+        await saver.aput_writes(config, [("messages", "b")], "task")
+
+        latest = await saver.aget_tuple(thread("t1"))
+        assert latest.pending_writes == [
+            ("task", "messages", "a"),
+            ("task", "other", 1),
+        ]
+
+    run(scenario)
+
+
+def test_list_filters_and_limits(run):
+    async def scenario():
+        saver = SQLAlchemyCheckpointSaver(keep_per_thread=10)
+        configs = [await put(saver, thread("t1"), 1)]
+        for step in (2, 3):
+            configs.append(await put(saver, configs[-1], step))
+        await put(saver, thread("t2"), 1)
+
+        listed = [c.config async for c in saver.alist(thread("t1"))]
+        assert listed == configs[::-1]
+
+        limited = [c.config async for c in saver.alist(thread("t1"), limit=1)]
+        assert limited == [configs[-1]]
+
+        before = [c.config async for c in saver.alist(thread("t1"), before=configs[2])]
+        assert before == [configs[1], configs[0]]
+
+        filtered = [
+            c.config async for c in saver.alist(thread("t1"), filter={"step": 2})
+        ]
+        assert filtered == [configs[1]]
+
+    run(scenario)
+
+
+def test_compaction_keeps_newest_checkpoints(run):
+    async def scenario():
+        saver = SQLAlchemyCheckpointSaver(keep_per_thread=2)
+        configs = [await put(saver, thread("t1"), 1)]
+        await saver.aput_writes(configs[0], [("messages", "a")], "task")
+        for step in (2, 3, 4):
+            configs.append(await put(saver, configs[-1], step))
+
+        listed = [c.config async for c in saver.alist(thread("t1"))]
+        assert listed == [configs[3], configs[2]]
+        assert await saver.aget_tuple(configs[0]) is None
+
+    run(scenario)
+
+
+def test_prune_and_delete_thread(run):
+    async def scenario():
+        saver = SQLAlchemyCheckpointSaver(retention_days=30)
+        await put(saver, thread("old"), 1)
+        await put(saver, thread("new"), 1)
+        await put(saver, thread("deleted"), 1)
+
+        long_ago = datetime.datetime.utcnow() - datetime.timedelta(days=31)
+        async with checkpointer_module.AsyncSessionLocal() as db:
+            await db.execute(
+                update(ConversationCheckpoint)
+                .where(ConversationCheckpoint.thread_id == "old")
+                .values(created_at=long_ago)
+            )
+            await db.commit()
+
+        await saver.prune()
+        await saver.adelete_thread("deleted")
+
+        assert await saver.aget_tuple(thread("old")) is None
+        assert await saver.aget_tuple(thread("deleted")) is None
+        assert await saver.aget_tuple(thread("new")) is not None
+
+    run(scenario)
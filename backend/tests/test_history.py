@@ -0,0 +1,80 @@
+import asyncio
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import (
+    AIMessage,
+    HumanMessage,
+    RemoveMessage,
+    ToolMessage,
+)
+from langgraph.graph.message import REMOVE_ALL_MESSAGES, add_messages
+
+from chat.history import ConversationCompactionMiddleware, compaction_stats
+
+
+def conversation(turns: int, tool_output: str) -> list:
+    messages = []
+    for turn in range(turns):
+        call_id = f"call-{turn}"
+        messages += [
+            HumanMessage(f"question {turn}"),
+            AIMessage(
+                "",
+                tool_calls=[{"name": "read_file", "args": {}, "id": call_id}],
+            ),
+            ToolMessage(tool_output, tool_call_id=call_id),
+            AIMessage(f"answer {turn}"),
+        ]
+    return messages
+
+
+def compact(middleware, messages: list) -> tuple[list, dict | None]:
+    """Run the middleware once and apply its update like the graph would."""
+    update = asyncio.run(middleware.abefore_model({"messages": messages}, None))
+    if update is None:
+        return messages, None
+    return add_messages(messages, update["messages"]), update
+
+
+def test_old_tool_results_are_digested_once():
+    compaction_stats.clear()
+    middleware = ConversationCompactionMiddleware(
+        GenericFakeChatModel(messages=iter([])),
+        keep_turns=2,
+        token_budget=1_000_000,
+        tool_digest_chars=100,
+    )
+    messages = conversation(4, "x" * 5000)
+
+    messages, update = compact(middleware, messages)
+    assert update is not None
+    tool_results = [m for m in messages if isinstance(m, ToolMessage)]
+    digests = tool_results[:2]
+    assert all(m.content.startswith("x" * 100 + "\n[") for m in digests)
+    assert all("4900 of 5000 characters omitted" in m.content for m in digests)
+    # Tool results in the kept turns are left alone.
+    assert all(m.content == "x" * 5000 for m in tool_results[2:])
+    assert compaction_stats["tool_results_digested"] == 2
+
+    # A digest is still longer than the limit; it must not be digested again.
+    again, update = compact(middleware, messages)
+    assert update is None
+    assert again == messages
+    assert compaction_stats["tool_results_digested"] == 2
+
+
+def test_old_turns_are_summarized_over_budget():
+    compaction_stats.clear()
+    model = GenericFakeChatModel(messages=iter([AIMessage("the summary")]))
+    middleware = ConversationCompactionMiddleware(
+        model, keep_turns=1, token_budget=10, tool_digest_chars=100
+    )
+    messages = conversation(3, "x" * 5000)
+
+    _, update = compact(middleware, messages)
+    removed, summary, *kept = update["messages"]
+    assert isinstance(removed, RemoveMessage) and removed.id == REMOVE_ALL_MESSAGES
+    assert summary.content.endswith("the summary")
+    assert kept == messages[-4:]
+    assert compaction_stats["summaries"] == 1
+    assert compaction_stats["messages_summarized"] == 8
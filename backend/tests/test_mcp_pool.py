@@ -0,0 +1,162 @@
+import asyncio
+
+import mcp_client
+import pytest
+from mcp_client import MCPSessionPool
+
+
+class FakeConnection:
+    """Stands in for _PooledConnection without a server behind it."""
+
+    opened: list["FakeConnection"] = []
+    open_delay = 0.0
+    fail_open = False
+
+    def __init__(self, url: str, on_notification=None):
+        self.url = url
+        self.in_flight = 0
+        self.last_used = 0.0
+        self.session = None
+        self.ping_ok = True
+        self.pings = 0
+        self.closed = False
+
+    @property
+    def alive(self) -> bool:
+        return self.session is not None and not self.closed
+
+    async def open(self) -> None:
+        await asyncio.sleep(self.open_delay)
+        if self.fail_open:
+            raise ConnectionError("connection refused")
+        self.session = object()
+        FakeConnection.opened.append(self)
+
+    async def ping(self) -> bool:
+        self.pings += 1
+        return self.ping_ok
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def fake_connections(monkeypatch):
+    monkeypatch.setattr(FakeConnection, "opened", [])
+    monkeypatch.setattr(mcp_client, "_PooledConnection", FakeConnection)
+
+
+def run(scenario):
+    """Run a pool scenario, failing instead of hanging if a waiter is never woken."""
+    asyncio.run(asyncio.wait_for(scenario(), timeout=5))
+
+
+def test_dead_connections_are_replaced():
+    async def scenario():
+        pool = MCPSessionPool("url", size=1)
+        first = await pool._acquire()
+        pool._release(first)
+        first.session = None
+
+        second = await pool._acquire()
+        assert second is not first
+        assert first.closed
+        assert pool.stats()["connections"] == 1
+
+    run(scenario)
+
+
+def test_idle_connections_are_pinged_before_reuse():
+    async def scenario():
+        pool = MCPSessionPool("url", size=1, idle_timeout=0)
+        conn = await pool._acquire()
+        pool._release(conn)
+        conn.last_used -= 1
+
+        assert await pool._acquire() is conn
+        assert conn.pings == 1
+        pool._release(conn)
+
+        conn.last_used -= 1
+        conn.ping_ok = False
+        replacement = await pool._acquire()
+        assert replacement is not conn
+        assert conn.closed
+        assert pool.stats()["connections"] == 1
+
+    run(scenario)
+
+
+def test_busy_connections_are_shared_up_to_the_size_limit():
+    async def scenario():
+        FakeConnection.open_delay = 0.05
+        try:
+            pool = MCPSessionPool("url", size=2)
+            conns = await asyncio.gather(*(pool._acquire() for _ in range(5)))
+        finally:
+            FakeConnection.open_delay = 0.0
+
+        # Callers that found every slot opening waited for those connections.
+        assert len(FakeConnection.opened) == 2
+        assert set(conns) == set(FakeConnection.opened)
+        assert pool.stats()["in_flight"] == 5
+        assert pool.stats()["opening"] == 0
+
+    run(scenario)
+
+
+def test_failed_open_frees_its_slot():
+    async def scenario():
+        pool = MCPSessionPool("url", size=1)
+        FakeConnection.fail_open = True
+        try:
+            with pytest.raises(ConnectionError):
+                await pool._acquire()
+        finally:
+            FakeConnection.fail_open = False
+
+        assert pool.stats()["opening"] == 0
+        assert (await pool._acquire()).alive
+
+    run(scenario)
+
+
+def test_connection_errors_are_retried_once_on_a_fresh_session():
+    async def scenario():
+        pool = MCPSessionPool("url", size=1)
+        sessions = []
+
+        async def flaky(session):
+            sessions.append(session)
+            if len(sessions) == 1:
+                raise ConnectionError("connection reset")
+            return "result"
+
+        assert await pool.run(flaky) == "result"
+        assert sessions[0] is not sessions[1]
+        assert FakeConnection.opened[0].closed
+
+        attempts = []
+
+        async def broken(session):
+            attempts.append(session)
+            raise ConnectionError("connection reset")
+
+        with pytest.raises(ConnectionError):
+            await pool.run(broken)
+        assert len(attempts) == 2
+        assert attempts[0] is not attempts[1]
+
+        calls = []
+
+        async def failing(session):
+            calls.append(session)
+            raise ValueError("bad arguments")
+
+        # Errors from the tool itself are not retried.
+        with pytest.raises(ValueError):
+            await pool.run(failing)
+        assert len(calls) == 1
+        assert pool.stats()["in_flight"] == 0
+
+    run(scenario)
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+
+# Upper bound on the total size of cached tool results, in characters.
+TOOL_CACHE_MAX_CHARS = int(os.getenv("TOOL_CACHE_MAX_CHARS", str(32 * 1024 * 1024)))
+
+# Time-to-live in seconds for each read-only tool whose results may be reused.
+# Tools that are not listed here are never cached.
+TOOL_CACHE_TTLS: dict[tuple[str, str], float] = {
+    ("google_drive", "list_files"): 60,
+    ("google_drive", "search_files"): 60,
+    ("google_drive", "list_tree"): 60,
+    ("google_drive", "read_file_content"): 300,
+    ("google_drive", "read_files"): 300,
+    ("github", "list_repos"): 300,
+    ("github", "search_repos"): 300,
+    ("github", "list_issues"): 60,
+    ("github", "list_pull_requests"): 60,
+    ("github", "list_branches"): 120,
+    ("github", "list_commits"): 60,
+    ("github", "get_file_content"): 300,
+    ("github", "repo_overview"): 60,
+    ("slack", "list_channels"): 300,
+    ("slack", "list_users"): 600,
+    ("slack", "get_channel_history"): 30,
+    ("slack", "get_thread_replies"): 30,
+    ("slack", "search_messages"): 60,
+}
+
+# Argument the agent can set on cacheable tools to force a fresh call.
+BYPASS_CACHE_ARG = "bypass_cache"
+
+
+def is_cacheable(server_name: str, tool_name: str) -> bool:
+    return TOOL_CACHE_TTLS.get((server_name, tool_name), 0) > 0
+
+
+def looks_like_error(result: str) -> bool:
+    """Whether a tool's text output reports a failure rather than a result."""
+    return result.startswith("Error") or result.startswith('{"error"')
+
+
+class ToolResultCache:
+    """In-memory LRU cache of read-only MCP tool results.
+
+    Entries are keyed by server, a hash of the caller's token, tool name and
+    the canonical JSON of the remaining arguments, so results are only shared
+    between calls made with the same credentials.
+    """
+
+    def __init__(self, *, max_chars: int = TOOL_CACHE_MAX_CHARS):
+        self.max_chars = max_chars
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(server_name: str, tool_name: str, arguments: dict) -> str:
+        arguments = dict(arguments)
+        token = str(arguments.pop("token", ""))
+        token_hash = hashlib.sha256(token.encode()).hexdigest()
+        canonical = json.dumps(arguments, sort_keys=True, default=str)
+        args_hash = hashlib.sha256(canonical.encode()).hexdigest()
+        return f"{server_name}:{token_hash}:{tool_name}:{args_hash}"
+
+    def _drop(self, key: str) -> None:
+        _, value = self._entries.pop(key)
+        self._size -= len(value)
+
+    def get(self, server_name: str, tool_name: str, arguments: dict) -> str | None:
+        if not is_cacheable(server_name, tool_name):
+            return None
+        key = self._key(server_name, tool_name, arguments)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(
+        self, server_name: str, tool_name: str, arguments: dict, result: str
+    ) -> None:
+        if not is_cacheable(server_name, tool_name) or looks_like_error(result):
+            return
+        if len(result) > self.max_chars:
+            return
+        key = self._key(server_name, tool_name, arguments)
+        if key in self._entries:
+            self._drop(key)
+        expires_at = time.monotonic() + TOOL_CACHE_TTLS[(server_name, tool_name)]
+        self._entries[key] = (expires_at, result)
+        self._size += len(result)
+        while self._size > self.max_chars:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "size_chars": self._size,
+            "max_chars": self.max_chars,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+tool_cache = ToolResultCache()
@@ -27,6 +27,53 @@ interface DriveFile {
   description?: string;
 }
 
+interface FilePage {
+  files: DriveFile[];
+  next_page_token: string | null;
+}
+
+interface PageRequest {
+  toolName: string;
+  args: Record<string, string>;
+}
+
+const PAGE_SIZE = 100;
+
+async function fetchFilePage(
+  username: string,
+  request: PageRequest,
+  pageToken?: string
+): Promise<FilePage | null> {
+  const res = await fetch("http://localhost:8000/mcp/google-drive/execute", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({
+      username,
+      tool_name: request.toolName,
+      arguments: { ...request.args, page_size: PAGE_SIZE, page_token: pageToken ?? "" }
+    })
+  });
+  const data = await res.json();
+
+  // Check if response is an error string
+  if (typeof data.response === 'string' && data.response.startsWith('Error')) {
+    console.error("MCP Error:", data.response);
+    return null;
+  }
+
+  try {
+    const parsedResponse = JSON.parse(data.response);
+    if (parsedResponse && Array.isArray(parsedResponse.files)) {
+      return parsedResponse;
+    }
+    console.error("MCP Error:", parsedResponse?.error ?? data.response);
+  } catch (e) {
+    console.error("Failed to parse files response", e);
+    console.log("Raw response:", data.response);
+  }
+  return null;
+}
+
 interface Breadcrumb {
   id: string;
   name: string;
@@ -44,6 +91,16 @@ export default function GoogleDriveConnectorPage() {
   const [searchQuery, setSearchQuery] = useState<string>("");
   const [sortField, setSortField] = useState<SortField>('name');
   const [sortOrder, setSortOrder] = useState<SortOrder>('asc');
+  const [pageRequest, setPageRequest] = useState<PageRequest | null>(null);
+  const [nextPageToken, setNextPageToken] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState<boolean>(false);
+
+  const showFirstPage = useCallback(async (username: string, request: PageRequest) => {
+    setPageRequest(request);
+    const page = await fetchFilePage(username, request);
+    setFiles(page ? page.files : []);
+    setNextPageToken(page ? page.next_page_token : null);
+  }, []);
 
   const fetchFiles = useCallback(async (username: string, folderId: string) => {
     setLoading(true);
@@ -52,46 +109,16 @@ export default function GoogleDriveConnectorPage() {
         ? `folder,name ${sortOrder === 'desc' ? 'desc' : ''}`.trim()
         : `folder,modifiedTime ${sortOrder === 'desc' ? 'desc' : ''}`.trim();
 
-      const args = { 
-        folder_id: folderId,
-        order_by: orderBy
-      };
-      
-      const res = await fetch("http://localhost:8000/mcp/google-drive/execute", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({
-          username,
-          tool_name: "list_files",
-          arguments: args
-        })
+      await showFirstPage(username, {
+        toolName: "list_files",
+        args: { folder_id: folderId, order_by: orderBy }
       });
-      const data = await res.json();
-      try {
-        // Check if response is an error string
-        if (typeof data.response === 'string' && data.response.startsWith('Error')) {
-          console.error("MCP Error:", data.response);
-          setFiles([]);
-          return;
-        }
-
-        const parsedResponse = JSON.parse(data.response);
-        if (Array.isArray(parsedResponse)) {
-          setFiles(parsedResponse);
-        } else {
-          setFiles([]);
-        }
-      } catch (e) {
-        console.error("Failed to parse files response", e);
-        console.log("Raw response:", data.response);
-        setFiles([]);
-      }
     } catch (error) {
       console.error("Failed to fetch files", error);
     } finally {
       setLoading(false);
     }
-  }, [sortField, sortOrder]);
+  }, [sortField, sortOrder, showFirstPage]);
 
   const checkStatus = useCallback(async (username: string) => {
     try {
@@ -181,42 +208,15 @@ export default function GoogleDriveConnectorPage() {
 
     setLoading(true);
     try {
-      const args = { 
-        query: `name contains '${searchQuery}' and trashed = false`,
-        order_by: sortField === 'name' 
-          ? `folder,name ${sortOrder === 'desc' ? 'desc' : ''}`.trim()
-          : `folder,modifiedTime ${sortOrder === 'desc' ? 'desc' : ''}`.trim()
-      };
-      
-      const res = await fetch("http://localhost:8000/mcp/google-drive/execute", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({
-          username: user,
-          tool_name: "search_files",
-          arguments: args
-        })
-      });
-      const data = await res.json();
-      try {
-        // Check if response is an error string
-        if (typeof data.response === 'string' && data.response.startsWith('Error')) {
-          console.error("MCP Error:", data.response);
-          setFiles([]);
-          return;
+      await showFirstPage(user, {
+        toolName: "search_files",
+        args: {
+          query: `name contains '${searchQuery}' and trashed = false`,
+          order_by: sortField === 'name' 
+            ? `folder,name ${sortOrder === 'desc' ? 'desc' : ''}`.trim()
+            : `folder,modifiedTime ${sortOrder === 'desc' ? 'desc' : ''}`.trim()
         }
-
-        const parsedResponse = JSON.parse(data.response);
-        if (Array.isArray(parsedResponse)) {
-          setFiles(parsedResponse);
-        } else {
-          setFiles([]);
-        }
-      } catch (e) {
-        console.error("Failed to parse search results", e);
-        console.log("Raw response:", data.response);
-        setFiles([]);
-      }
+      });
     } catch (error) {
       console.error("Failed to search", error);
     } finally {
@@ -224,6 +224,24 @@ export default function GoogleDriveConnectorPage() {
     }
   };
 
+  const handleLoadMore = async () => {
+    const user = getUsernameFromStoredAuth();
+    if (!user || !pageRequest || !nextPageToken) return;
+
+    setLoadingMore(true);
+    try {
+      const page = await fetchFilePage(user, pageRequest, nextPageToken);
+      if (page) {
+        setFiles((current) => [...current, ...page.files]);
+        setNextPageToken(page.next_page_token);
+      }
+    } catch (error) {
+      console.error("Failed to load more files", error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   return (
     <div className="max-w-5xl mx-auto p-6">
       {/* Connection Card */}
@@ -360,11 +378,19 @@ export default function GoogleDriveConnectorPage() {
                   </tbody>
                 </table>
                 
-                {/* Pagination Controls Removed */}
                 <div className="flex items-center justify-between px-6 py-4 border-t border-gray-100">
                   <div className="text-sm text-gray-500">
                     Showing {files.length} items
                   </div>
+                  {nextPageToken && (
+                    <button
+                      onClick={handleLoadMore}
+                      disabled={loadingMore}
+                      className="px-4 py-2 text-sm font-medium text-blue-600 bg-blue-50 hover:bg-blue-100 rounded-lg transition-colors border border-blue-100 disabled:opacity-50"
+                    >
+                      {loadingMore ? "Loading..." : "Load more"}
+                    </button>
+                  )}
                 </div>
               </div>
             )}
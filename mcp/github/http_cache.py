@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import Counter
+
+# SQLite database holding cached GitHub API responses.
+GITHUB_HTTP_CACHE_PATH = os.getenv(
+    "GITHUB_HTTP_CACHE_PATH",
+    os.path.join(tempfile.gettempdir(), "github-http-cache.sqlite3"),
+)
+# Least recently used responses are removed once there are more than this many.
+GITHUB_HTTP_CACHE_MAX_ENTRIES = int(
+    os.getenv("GITHUB_HTTP_CACHE_MAX_ENTRIES", "20000")
+)
+GITHUB_HTTP_CACHE_ENABLED = (
+    os.getenv("GITHUB_HTTP_CACHE_ENABLED", "true").lower() == "true"
+)
+# The entry limit is enforced after every this many stored responses.
+_TRIM_INTERVAL = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    headers TEXT NOT NULL,
+    body TEXT NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_by_use ON responses (used_at);
+"""
+
+# Headers of a 304 that describe the body rather than the request, and so
+# must come from the cached 200 instead.
+_BODY_HEADERS = (
+    'content-length', 'content-type', 'content-encoding', 'transfer-encoding'
+)
+
+
+class CachedResponse:
+    """A stored 200 response, shaped like PyGithub's RequestsResponse."""
+
+    def __init__(self, headers: dict, body: str):
+        self.status = 200
+        self.headers = headers
+        self._body = body
+
+    def getheaders(self):
+        return self.headers.items()
+
+    def read(self) -> str:
+        return self._body
+
+
+class HTTPCache:
+    """
+    Persistent ETag / Last-Modified cache of GitHub GET responses.
+
+    Responses are keyed by URL and a hash of the Authorization header, since
+    what a URL returns depends on who asks. Revalidating a stored response
+    costs a conditional request, which GitHub answers with a 304 that doesn't
+    count against the rate limit when nothing changed.
+    """
+
+    def __init__(
+        self,
+        path: str = GITHUB_HTTP_CACHE_PATH,
+        max_entries: int = GITHUB_HTTP_CACHE_MAX_ENTRIES,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.counters = Counter()
+        self._db().executescript(_SCHEMA)
+
+    def _db(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared between threads.
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None
+            )
+            db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    @staticmethod
+    def key(authorization: str, url: str) -> str:
+        return hashlib.sha256(json.dumps([authorization, url]).encode()).hexdigest()
+
+    def lookup(self, key: str):
+        """Return (etag, last_modified, headers, body) for a key, or None."""
+        row = self._db().execute(
+            "SELECT etag, last_modified, headers, body FROM responses WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, headers, body = row
+        return etag, last_modified, json.loads(headers), body
+
+    def revalidated(self, key: str, cached, not_modified_headers) -> CachedResponse:
+        """Turn a 304 for a stored response into that response."""
+        _, _, headers, body = cached
+        # Rate limit and date headers come from the fresh 304.
+        for name, value in not_modified_headers.items():
+            if name.lower() not in _BODY_HEADERS:
+                headers[name] = value
+        self._db().execute(
+            "UPDATE responses SET used_at = ? WHERE key = ?", (time.time(), key)
+        )
+        self.counters["hits"] += 1
+        return CachedResponse(headers, body)
+
+    def store(self, key: str, headers, body: str) -> None:
+        """Keep a 200 response that can be revalidated later."""
+        self.counters["misses"] += 1
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+        self._db().execute(
+            "INSERT OR REPLACE INTO responses "
+            "(key, etag, last_modified, headers, body, used_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, etag, last_modified, json.dumps(dict(headers)), body, time.time()),
+        )
+        self.counters["stored"] += 1
+        with self._lock:
+            self._puts += 1
+            trim = self._puts % _TRIM_INTERVAL == 0
+        if trim:
+            self._trim()
+
+    def _trim(self) -> None:
+        deleted = self._db().execute(
+            "DELETE FROM responses WHERE key IN "
+            "(SELECT key FROM responses ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        ).rowcount
+        self.counters["evictions"] += deleted
+
+    def stats(self) -> dict:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        entries = self._db().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.counters["hits"],
+            "misses": self.counters["misses"],
+            "stored": self.counters["stored"],
+            "evictions": self.counters["evictions"],
+            "hit_rate": round(self.counters["hits"] / lookups, 3) if lookups else 0.0,
+        }
+
+
+http_cache = HTTPCache() if GITHUB_HTTP_CACHE_ENABLED else None
@@ -1,14 +1,217 @@
 from mcp.server.fastmcp import FastMCP
-from github import Github
+import os
+import functools
+import anyio
+import requests
+from github import Auth, Consts, Github
+from github.Requester import (
+    HTTPRequestsConnectionClass,
+    HTTPSRequestsConnectionClass,
+    Requester,
+    RequestsResponse,
+)
 import json
 import base64
+from starlette.responses import JSONResponse
+from http_cache import http_cache
 
 # Initialize FastMCP server
 # Using port 8081 to avoid conflict with google-drive on 8080 if run locally, 
 # though in docker-compose they would have their own IPs.
 mcp = FastMCP("github", host="0.0.0.0", port=8080) 
 
+# Tool bodies make blocking API calls, so they run on worker threads instead
+# of the event loop. This caps how many run at once in this server process.
+MCP_MAX_CONCURRENCY = int(os.getenv("MCP_MAX_CONCURRENCY", "16"))
+_tool_limiter = anyio.CapacityLimiter(MCP_MAX_CONCURRENCY)
+
+
+def run_in_thread(func):
+    """Run a blocking tool on a worker thread, keeping the server responsive."""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await anyio.to_thread.run_sync(
+            functools.partial(func, *args, **kwargs), limiter=_tool_limiter
+        )
+    return wrapper
+
+
+# Every client sends its requests over this session, so TLS connections to
+# api.github.com are kept alive and shared across tokens and tool calls.
+_session = requests.Session()
+_session.auth = Requester.noopAuth
+_session.mount("https://", requests.adapters.HTTPAdapter(
+    max_retries=Github.default_retry,
+    pool_connections=MCP_MAX_CONCURRENCY,
+    pool_maxsize=MCP_MAX_CONCURRENCY,
+))
+
+
+class SharedSessionConnection(HTTPSRequestsConnectionClass):
+    """
+    PyGithub connection that sends requests over the shared session.
+    PyGithub creates one of these per request, and each tool call has its own
+    client, so concurrent calls don't share request state. GET responses are
+    revalidated against the HTTP cache with conditional requests.
+    """
+
+    def __init__(
+        self,
+        host,
+        port=None,
+        strict=False,
+        timeout=None,
+        retry=None,
+        pool_size=None,
+        **kwargs,
+    ):
+        self.port = port if port else 443
+        self.host = host
+        self.protocol = "https"
+        self.timeout = timeout
+        self.verify = kwargs.get("verify", True)
+        self.session = _session
+
+    def getresponse(self):
+        headers = {name.lower() for name in self.headers}
+        if (
+            http_cache is None
+            or self.verb != "GET"
+            or self.stream
+            or 'if-none-match' in headers
+            or 'if-modified-since' in headers
+        ):
+            return super().getresponse()
+
+        url = f"{self.protocol}://{self.host}:{self.port}{self.url}"
+        key = http_cache.key(self.headers.get("Authorization", ""), url)
+        cached = http_cache.lookup(key)
+        headers = dict(self.headers)
+        if cached is not None:
+            etag, last_modified, _, _ = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        r = self.session.get(
+            url,
+            headers=headers,
+            timeout=self.timeout,
+            verify=self.verify,
+            allow_redirects=False,
+        )
+        if r.status_code == 304 and cached is not None:
+            return http_cache.revalidated(key, cached, r.headers)
+        if r.status_code == 200:
+            http_cache.store(key, r.headers, r.text)
+        return RequestsResponse(r)
+
+    def close(self) -> None:
+        # The session outlives every connection object.
+        pass
+
+
+Requester.injectConnectionClasses(HTTPRequestsConnectionClass, SharedSessionConnection)
+
+GITHUB_GRAPHQL_URL = os.getenv("GITHUB_GRAPHQL_URL", "https://api.github.com/graphql")
+# Sections repo_overview returns when the caller doesn't choose any.
+OVERVIEW_SECTIONS = ("metadata", "issues", "pull_requests", "branches", "commits")
+# GraphQL connections return at most this many nodes per page.
+OVERVIEW_MAX_COUNT = 100
+
+# Every section is always in the query and switched on or off with @include,
+# so the query text stays the same and GitHub can cache its parsing.
+REPO_OVERVIEW_QUERY = """
+query RepoOverview(
+  $owner: String!, $name: String!,
+  $metadata: Boolean!, $issues: Boolean!, $pullRequests: Boolean!,
+  $branches: Boolean!, $commits: Boolean!,
+  $issueCount: Int!, $pullRequestCount: Int!, $branchCount: Int!, $commitCount: Int!,
+  $issueStates: [IssueState!], $pullRequestStates: [PullRequestState!]
+) {
+  repository(owner: $owner, name: $name) {
+    nameWithOwner
+    ... @include(if: $metadata) {
+      description
+      url
+      isPrivate
+      isArchived
+      isFork
+      stargazerCount
+      forkCount
+      pushedAt
+      updatedAt
+      primaryLanguage { name }
+      licenseInfo { spdxId }
+      repositoryTopics(first: 20) { nodes { topic { name } } }
+      openIssues: issues(states: OPEN) { totalCount }
+      openPullRequests: pullRequests(states: OPEN) { totalCount }
+    }
+    defaultBranchRef {
+      name
+      target @include(if: $commits) {
+        ... on Commit {
+          history(first: $commitCount) {
+            nodes {
+              oid
+              message
+              url
+              author { name email date }
+            }
+          }
+        }
+      }
+    }
+    issues(
+      first: $issueCount
+      states: $issueStates
+      orderBy: {field: CREATED_AT, direction: DESC}
+    ) @include(if: $issues) {
+      totalCount
+      nodes { number title state url createdAt author { login } }
+    }
+    pullRequests(
+      first: $pullRequestCount
+      states: $pullRequestStates
+      orderBy: {field: CREATED_AT, direction: DESC}
+    ) @include(if: $pullRequests) {
+      totalCount
+      nodes {
+        number title state url createdAt author { login } headRefName baseRefName
+      }
+    }
+    refs(
+      refPrefix: "refs/heads/"
+      first: $branchCount
+      orderBy: {field: TAG_COMMIT_DATE, direction: DESC}
+    ) @include(if: $branches) {
+      totalCount
+      nodes { name target { oid } }
+    }
+  }
+}
+"""
+
+_ISSUE_STATES = {"open": ["OPEN"], "closed": ["CLOSED"], "all": ["OPEN", "CLOSED"]}
+_PULL_REQUEST_STATES = {
+    "open": ["OPEN"],
+    "closed": ["CLOSED", "MERGED"],
+    "all": ["OPEN", "CLOSED", "MERGED"],
+}
+
+
+def get_client(token: str) -> Github:
+    """
+    Return a client for a token. Clients are cheap because their connections
+    come from the shared session, and each tool call gets its own: PyGithub's
+    Requester can hand one connection object to two threads at once. Clients
+    are lazy, so get_repo() doesn't fetch the repository before it is used.
+    """
+    return Github(auth=Auth.Token(token), lazy=True)
+
+
 @mcp.tool()
+@run_in_thread
 def list_repos(token: str, sort: str = "updated", direction: str = "desc") -> str:
     """
     List repositories for the authenticated user. Returns a JSON string.
@@ -19,7 +222,7 @@ def list_repos(token: str, sort: str = "updated", direction: str = "desc") -> st
         direction: Sort direction (asc, desc).
     """
     try:
-        g = Github(token)
+        g = get_client(token)
         user = g.get_user()
         repos = []
         # Limiting to first 100 for performance in this example, though pagination handles more
@@ -40,6 +243,7 @@ def list_repos(token: str, sort: str = "updated", direction: str = "desc") -> st
         return json.dumps({"error": str(e)})
 
 @mcp.tool()
+@run_in_thread
 def search_repos(token: str, query: str) -> str:
     """
     Search for repositories. Returns a JSON string.
@@ -49,7 +253,7 @@ def search_repos(token: str, query: str) -> str:
         query: The search query string.
     """
     try:
-        g = Github(token)
+        g = get_client(token)
         repos = []
         results = g.search_repositories(query=query)
         for repo in results:
@@ -69,6 +273,7 @@ def search_repos(token: str, query: str) -> str:
         return json.dumps({"error": str(e)})
 
 @mcp.tool()
+@run_in_thread
 def list_issues(token: str, repo_full_name: str, state: str = "open") -> str:
     """
     List issues for a specific repository. Returns a JSON string.
@@ -79,7 +284,7 @@ def list_issues(token: str, repo_full_name: str, state: str = "open") -> str:
         state: State of the issues to return (open, closed, all).
     """
     try:
-        g = Github(token)
+        g = get_client(token)
         repo = g.get_repo(repo_full_name)
         issues = []
         for issue in repo.get_issues(state=state):
@@ -98,6 +303,7 @@ def list_issues(token: str, repo_full_name: str, state: str = "open") -> str:
         return json.dumps({"error": str(e)})
 
 @mcp.tool()
+@run_in_thread
 def list_commits(token: str, repo_full_name: str, branch: str = None, limit: int = 10) -> str:
     """
     List commits for a specific repository branch. Returns a JSON string.
@@ -109,7 +315,7 @@ def list_commits(token: str, repo_full_name: str, branch: str = None, limit: int
         limit: Max number of commits to return (default 10).
     """
     try:
-        g = Github(token)
+        g = get_client(token)
         repo = g.get_repo(repo_full_name)
         
         kwargs = {}
@@ -133,6 +339,7 @@ def list_commits(token: str, repo_full_name: str, branch: str = None, limit: int
         return json.dumps({"error": str(e)})
 
 @mcp.tool()
+@run_in_thread
 def list_branches(token: str, repo_full_name: str) -> str:
     """
     List branches for a specific repository. Returns a JSON string.
@@ -142,7 +349,7 @@ def list_branches(token: str, repo_full_name: str) -> str:
         repo_full_name: The full name of the repository (e.g., "owner/repo").
     """
     try:
-        g = Github(token)
+        g = get_client(token)
         repo = g.get_repo(repo_full_name)
         branches = []
         for branch in repo.get_branches():
@@ -158,6 +365,7 @@ def list_branches(token: str, repo_full_name: str) -> str:
         return json.dumps({"error": str(e)})
 
 @mcp.tool()
+@run_in_thread
 def list_pull_requests(token: str, repo_full_name: str, state: str = "open") -> str:
     """
     List pull requests for a specific repository. Returns a JSON string.
@@ -168,7 +376,7 @@ def list_pull_requests(token: str, repo_full_name: str, state: str = "open") ->
         state: State of the PRs to return (open, closed, all).
     """
     try:
-        g = Github(token)
+        g = get_client(token)
         repo = g.get_repo(repo_full_name)
         prs = []
         for pr in repo.get_pulls(state=state):
@@ -189,6 +397,7 @@ def list_pull_requests(token: str, repo_full_name: str, state: str = "open") ->
         return json.dumps({"error": str(e)})
 
 @mcp.tool()
+@run_in_thread
 def get_file_content(token: str, repo_full_name: str, file_path: str, ref: str = None) -> str:
     """
     Get the content of a file in a repository. Returns the decoded content as a string.
@@ -200,7 +409,7 @@ def get_file_content(token: str, repo_full_name: str, file_path: str, ref: str =
         ref: The name of the commit/branch/tag. Default: the repository’s default branch.
     """
     try:
-        g = Github(token)
+        g = get_client(token)
         repo = g.get_repo(repo_full_name)
         if ref:
             contents = repo.get_contents(file_path, ref=ref)
@@ -214,5 +423,166 @@ def get_file_content(token: str, repo_full_name: str, file_path: str, ref: str =
     except Exception as e:
         return json.dumps({"error": str(e)})
 
+def _login(node):
+    return node["author"]["login"] if node.get("author") else None
+
+
+def _overview(repository: dict, sections: set) -> dict:
+    """Reshape a RepoOverview result like the matching REST tools' output."""
+    overview = {"full_name": repository["nameWithOwner"]}
+    default_branch = repository.get("defaultBranchRef") or {}
+    if "metadata" in sections:
+        overview.update({
+            "description": repository["description"],
+            "html_url": repository["url"],
+            "private": repository["isPrivate"],
+            "archived": repository["isArchived"],
+            "fork": repository["isFork"],
+            "default_branch": default_branch.get("name"),
+            "language": (repository["primaryLanguage"] or {}).get("name"),
+            "license": (repository["licenseInfo"] or {}).get("spdxId"),
+            "topics": [
+                node["topic"]["name"]
+                for node in repository["repositoryTopics"]["nodes"]
+            ],
+            "stars": repository["stargazerCount"],
+            "forks": repository["forkCount"],
+            "open_issues": repository["openIssues"]["totalCount"],
+            "open_pull_requests": repository["openPullRequests"]["totalCount"],
+            "pushed_at": repository["pushedAt"],
+            "updated_at": repository["updatedAt"],
+        })
+    if "issues" in sections:
+        overview["issues"] = [{
+            "number": issue["number"],
+            "title": issue["title"],
+            "state": issue["state"].lower(),
+            "html_url": issue["url"],
+            "created_at": issue["createdAt"],
+            "user": _login(issue),
+        } for issue in repository["issues"]["nodes"]]
+    if "pull_requests" in sections:
+        overview["pull_requests"] = [{
+            "number": pr["number"],
+            "title": pr["title"],
+            "state": pr["state"].lower(),
+            "html_url": pr["url"],
+            "created_at": pr["createdAt"],
+            "user": _login(pr),
+            "head_branch": pr["headRefName"],
+            "base_branch": pr["baseRefName"],
+        } for pr in repository["pullRequests"]["nodes"]]
+    if "branches" in sections:
+        overview["branches"] = [{
+            "name": ref["name"],
+            "commit_sha": ref["target"]["oid"] if ref.get("target") else None,
+        } for ref in repository["refs"]["nodes"]]
+    if "commits" in sections:
+        # Empty repositories have no default branch and so no history.
+        history = (default_branch.get("target") or {}).get("history") or {"nodes": []}
+        overview["commits"] = [{
+            "sha": commit["oid"],
+            "message": commit["message"],
+            "author_name": (commit["author"] or {}).get("name"),
+            "author_email": (commit["author"] or {}).get("email"),
+            "date": (commit["author"] or {}).get("date"),
+            "url": commit["url"],
+        } for commit in history["nodes"]]
+    return overview
+
+
+@mcp.tool()
+@run_in_thread
+def repo_overview(
+    token: str,
+    repo_full_name: str,
+    sections: str = ",".join(OVERVIEW_SECTIONS),
+    state: str = "open",
+    issue_count: int = 10,
+    pull_request_count: int = 10,
+    branch_count: int = 20,
+    commit_count: int = 10,
+) -> str:
+    """
+    Get an overview of a repository in a single request: key metadata, recent
+    issues, pull requests with their head and base branches, branches and
+    recent commits on the default branch. Prefer this over calling
+    list_issues, list_pull_requests, list_branches and list_commits one by one.
+    Returns a JSON string.
+
+    Args:
+        token: The GitHub Personal Access Token or OAuth token.
+        repo_full_name: The full name of the repository (e.g., "owner/repo").
+        sections: Comma-separated sections to include: metadata, issues,
+                  pull_requests, branches, commits.
+        state: State of the issues and PRs to return (open, closed, all).
+        issue_count: Number of most recent issues to return (at most 100).
+        pull_request_count: Number of most recent pull requests to return (at most 100).
+        branch_count: Number of most recently updated branches to return (at most 100).
+        commit_count: Number of most recent commits to return (at most 100).
+    """
+    try:
+        owner, _, name = repo_full_name.partition("/")
+        if not owner or not name:
+            error = f"Invalid repository name '{repo_full_name}'. Use 'owner/repo'."
+            return json.dumps({"error": error})
+        chosen = {section.strip() for section in sections.split(",") if section.strip()}
+        unknown = chosen - set(OVERVIEW_SECTIONS)
+        if unknown:
+            return json.dumps({
+                "error": f"Unknown sections: {', '.join(sorted(unknown))}. "
+                f"Choose from: {', '.join(OVERVIEW_SECTIONS)}."
+            })
+        if state not in _ISSUE_STATES:
+            return json.dumps(
+                {"error": f"Invalid state '{state}'. Use open, closed or all."}
+            )
+
+        def count(value: int) -> int:
+            return max(1, min(OVERVIEW_MAX_COUNT, value))
+
+        variables = {
+            "owner": owner,
+            "name": name,
+            "metadata": "metadata" in chosen,
+            "issues": "issues" in chosen,
+            "pullRequests": "pull_requests" in chosen,
+            "branches": "branches" in chosen,
+            "commits": "commits" in chosen,
+            "issueCount": count(issue_count),
+            "pullRequestCount": count(pull_request_count),
+            "branchCount": count(branch_count),
+            "commitCount": count(commit_count),
+            "issueStates": _ISSUE_STATES[state],
+            "pullRequestStates": _PULL_REQUEST_STATES[state],
+        }
+        r = _session.post(
+            GITHUB_GRAPHQL_URL,
+            json={"query": REPO_OVERVIEW_QUERY, "variables": variables},
+            headers={"Authorization": f"bearer {token}"},
+            timeout=Consts.DEFAULT_TIMEOUT,
+        )
+        r.raise_for_status()
+        result = r.json()
+        repository = (result.get("data") or {}).get("repository")
+        errors = [
+            error.get("message", str(error)) for error in result.get("errors", [])
+        ]
+        if repository is None:
+            error = "; ".join(errors) or f"Repository '{repo_full_name}' not found."
+            return json.dumps({"error": error})
+        overview = _overview(repository, chosen)
+        if errors:
+            overview["errors"] = errors
+        return json.dumps(overview)
+    except Exception as e:
+        return json.dumps({"error": str(e)})
+
+@mcp.custom_route("/stats", methods=["GET"])
+async def stats(request):
+    return JSONResponse({
+        "http_cache": http_cache.stats() if http_cache is not None else None,
+    })
+
 if __name__ == "__main__":
     mcp.run(transport="sse")
@@ -0,0 +1,46 @@
+from http_cache import HTTPCache
+
+
+def test_revalidated_response_keeps_the_cached_body(tmp_path):
+    cache = HTTPCache(str(tmp_path / "cache.db"))
+    key = cache.key("token a", "https://api.github.com/repos/o/r")
+    cache.store(key, {"ETag": '"v1"', "Content-Type": "application/json"}, "{}")
+
+    cached = cache.lookup(key)
+    assert cached[:2] == ('"v1"', None)
+    response = cache.revalidated(
+        key, cached, {"Content-Type": "text/plain", "X-RateLimit-Remaining": "42"}
+    )
+    assert response.status == 200
+    assert response.read() == "{}"
+    # Rate limit headers come from the 304, body headers from the cached 200.
+    assert response.headers["X-RateLimit-Remaining"] == "42"
+    assert response.headers["Content-Type"] == "application/json"
+    assert cache.stats()["hits"] == 1
+
+
+def test_responses_are_kept_per_caller(tmp_path):
+    cache = HTTPCache(str(tmp_path / "cache.db"))
+    url = "https://api.github.com/user/repos"
+    assert cache.key("token a", url) != cache.key("token b", url)
+
+
+def test_responses_without_validators_are_not_stored(tmp_path):
+    cache = HTTPCache(str(tmp_path / "cache.db"))
+    key = cache.key("token a", "https://api.github.com/rate_limit")
+    cache.store(key, {"Content-Type": "application/json"}, "{}")
+    assert cache.lookup(key) is None
+
+
+def test_least_recently_used_responses_are_trimmed(tmp_path):
+    cache = HTTPCache(str(tmp_path / "cache.db"), max_entries=2)
+    keys = [cache.key("token", f"https://api.github.com/{i}") for i in range(3)]
+    for key in keys:
+        cache.store(key, {"ETag": '"v"'}, "{}")
+    cache.revalidated(keys[0], cache.lookup(keys[0]), {})
+
+    cache._trim()
+    assert cache.lookup(keys[0]) is not None
+    assert cache.lookup(keys[1]) is None
+    assert cache.lookup(keys[2]) is not None
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,502 @@
+import csv
+import io
+import itertools
+import multiprocessing
+import os
+import re
+import resource
+import subprocess
+import sys
+import threading
+from dataclasses import dataclass, field
+from xml.etree import ElementTree
+
+import openpyxl
+from docx import Document
+from openpyxl.utils import column_index_from_string
+from pptx import Presentation
+from pypdf import PdfReader
+
+# Outlines longer than this are cut short so they don't crowd out the text.
+OUTLINE_MAX_ITEMS = 200
+
+# Documents are parsed in separate processes so CPU-heavy or runaway parsers
+# can't stall or crash the server. At most this many run at once.
+DRIVE_EXTRACT_WORKERS = int(
+    os.getenv("DRIVE_EXTRACT_WORKERS", str(os.cpu_count() or 1))
+)
+# Parsers still running after this many seconds are killed.
+DRIVE_EXTRACT_TIMEOUT = float(os.getenv("DRIVE_EXTRACT_TIMEOUT", "60"))
+# Address-space limit for each parser process, in megabytes (0 disables it).
+DRIVE_EXTRACT_MEMORY_MB = int(os.getenv("DRIVE_EXTRACT_MEMORY_MB", "1024"))
+# Parser processes are replaced after this many documents.
+DRIVE_EXTRACT_MAX_JOBS = int(os.getenv("DRIVE_EXTRACT_MAX_JOBS", "100"))
+
+
+class ExtractionError(Exception):
+    pass
+
+
+@dataclass
+class Extraction:
+    """
+    Text pulled from a document. Paged formats keep one section per page,
+    slide or sheet so callers can read them selectively.
+    """
+    sections: list[tuple[str, str]] = field(default_factory=list)
+    unit: str = None
+    total: int = 0
+    selected: list[int] = field(default_factory=list)
+    outline: list[str] = field(default_factory=list)
+
+    def text(self) -> str:
+        if self.unit is None:
+            return "\n".join(text for _, text in self.sections)
+        return "\n".join(
+            f"--- {heading} ---\n{text}" for heading, text in self.sections
+        )
+
+
+def parse_ranges(spec: str, total: int) -> list[int]:
+    """
+    Turn a spec like '1-3,7,10-' into sorted 1-based numbers within 1..total.
+    An empty spec selects everything.
+    """
+    if not spec or not spec.strip():
+        return list(range(1, total + 1))
+    numbers = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        match = re.fullmatch(r'(\d+)|(\d*)\s*-\s*(\d*)', part)
+        if not match:
+            raise ValueError(
+                f"Invalid range '{part}'. Use numbers like '3', '1-5' or '10-'."
+            )
+        if match.group(1):
+            first = last = int(match.group(1))
+        else:
+            first = int(match.group(2) or 1)
+            last = int(match.group(3) or total)
+        numbers.update(range(max(1, first), min(total, last) + 1))
+    return sorted(numbers)
+
+
+def format_ranges(numbers: list[int]) -> str:
+    """Inverse of parse_ranges: [1, 2, 3, 7] -> '1-3, 7'."""
+    parts = []
+    start = prev = None
+    for n in numbers:
+        if prev is not None and n == prev + 1:
+            prev = n
+            continue
+        if start is not None:
+            parts.append(str(start) if start == prev else f"{start}-{prev}")
+        start = prev = n
+    if start is not None:
+        parts.append(str(start) if start == prev else f"{start}-{prev}")
+    return ", ".join(parts)
+
+
+def _pdf_outline(reader, items, lines: list[str], depth: int = 0) -> None:
+    for item in items:
+        if len(lines) >= OUTLINE_MAX_ITEMS:
+            return
+        if isinstance(item, list):
+            _pdf_outline(reader, item, lines, depth + 1)
+            continue
+        try:
+            page = f" (page {reader.get_destination_page_number(item) + 1})"
+        except Exception:
+            page = ""
+        lines.append(f"{'  ' * depth}- {item.title}{page}")
+
+
+def extract_pdf(file, pages: str = "") -> Extraction:
+    reader = PdfReader(file)
+    total = len(reader.pages)
+    selected = parse_ranges(pages, total)
+
+    outline = []
+    try:
+        _pdf_outline(reader, reader.outline, outline)
+    except Exception:
+        # Malformed outlines are common; the pages are still readable.
+        outline = []
+
+    # Only the requested pages are parsed.
+    sections = [
+        (f"Page {n}", reader.pages[n - 1].extract_text() or "") for n in selected
+    ]
+    return Extraction(sections, 'page', total, selected, outline)
+
+
+def extract_docx(file) -> Extraction:
+    # DOCX files have no fixed pages; use offset/max_chars to read them in parts.
+    doc = Document(file)
+    outline = []
+    for para in doc.paragraphs:
+        style = para.style.name if para.style is not None else ""
+        if (style.startswith('Heading') or style == 'Title') and para.text.strip():
+            level = style.removeprefix('Heading').strip()
+            depth = int(level) - 1 if level.isdigit() else 0
+            outline.append(f"{'  ' * depth}- {para.text.strip()}")
+            if len(outline) >= OUTLINE_MAX_ITEMS:
+                break
+
+    text = "\n".join(para.text for para in doc.paragraphs)
+    return Extraction([("", text)], outline=outline)
+
+
+def _slide_title(slide) -> str:
+    title = slide.shapes.title
+    if title is not None and title.text.strip():
+        return title.text.strip()
+    for shape in slide.shapes:
+        if hasattr(shape, "text") and shape.text.strip():
+            return shape.text.strip().splitlines()[0]
+    return "(untitled)"
+
+
+def extract_pptx(file, pages: str = "") -> Extraction:
+    slides = list(Presentation(file).slides)
+    total = len(slides)
+    selected = parse_ranges(pages, total)
+    outline = [
+        f"- Slide {n}: {_slide_title(slide)}"
+        for n, slide in enumerate(slides[:OUTLINE_MAX_ITEMS], start=1)
+    ]
+
+    sections = []
+    for n in selected:
+        shapes = slides[n - 1].shapes
+        text = "\n".join(shape.text for shape in shapes if hasattr(shape, "text"))
+        sections.append((f"Slide {n}", text))
+    return Extraction(sections, 'slide', total, selected, outline)
+
+
+def _bounds(spec: str, convert, what: str):
+    """Parse a single range like '10-50', '10-', '-50' or '7' into (first, last)."""
+    if not spec or not spec.strip():
+        return 1, None
+    first, sep, last = spec.partition('-')
+    try:
+        first = convert(first.strip()) if first.strip() else 1
+        last = convert(last.strip()) if last.strip() else None
+    except ValueError:
+        raise ValueError(f"Invalid {what} range '{spec}'.") from None
+    return first, (last if sep else first)
+
+
+def _column_number(value: str) -> int:
+    return int(value) if value.isdigit() else column_index_from_string(value.upper())
+
+
+def row_bounds(rows: str):
+    return _bounds(rows, int, "rows")
+
+
+def column_bounds(columns: str):
+    return _bounds(columns, _column_number, "columns")
+
+
+def _sheet_size(ws) -> str:
+    # Read-only sheets take their size from the file, which may not record it.
+    if ws.max_row is None or ws.max_column is None:
+        return "size unknown"
+    return f"{ws.max_row} rows x {ws.max_column} columns"
+
+
+def tabulate(rows, first_row: int, sheet_format: str = "tsv", char_budget: int = 0):
+    """
+    Write rows of cell values as TSV or CSV, skipping trailing and fully
+    empty cells, until char_budget characters (0 for no limit) are written.
+    Returns the text and the row number it stopped at, or None.
+    """
+    buffer = io.StringIO()
+    delimiter = ',' if sheet_format == 'csv' else '\t'
+    writer = csv.writer(buffer, delimiter=delimiter, lineterminator='\n')
+    for row_number, row in enumerate(rows, start=first_row):
+        values = list(row)
+        while values and values[-1] in (None, ""):
+            values.pop()
+        if not values:
+            continue
+        if char_budget and buffer.tell() >= char_budget:
+            return buffer.getvalue(), row_number
+        writer.writerow(["" if value is None else value for value in values])
+    return buffer.getvalue(), None
+
+
+def stopped_note(stopped_at) -> str:
+    if stopped_at is None:
+        return ""
+    return f"[Stopped at row {stopped_at}. Pass rows='{stopped_at}-' to read on.]"
+
+
+def extract_xlsx(
+    file,
+    pages: str = "",
+    rows: str = "",
+    columns: str = "",
+    sheet_format: str = "tsv",
+    char_budget: int = 0,
+) -> Extraction:
+    """
+    Stream the selected sheets as TSV or CSV. The workbook is opened read-only
+    so rows are parsed lazily and memory stays flat; extraction stops once
+    char_budget characters (0 for no limit) have been produced.
+    """
+    wb = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        names = wb.sheetnames
+        total = len(names)
+        selected = parse_ranges(pages, total)
+        outline = [
+            f"- Sheet {n}: {name} ({_sheet_size(wb[name])})"
+            for n, name in enumerate(names[:OUTLINE_MAX_ITEMS], start=1)
+        ]
+        min_row, max_row = row_bounds(rows)
+        min_col, max_col = column_bounds(columns)
+
+        sections = []
+        shown = []
+        used = 0
+        for n in selected:
+            if char_budget and used >= char_budget:
+                break
+            name = names[n - 1]
+            cells = wb[name].iter_rows(
+                min_row=min_row,
+                max_row=max_row,
+                min_col=min_col,
+                max_col=max_col,
+                values_only=True,
+            )
+            budget = char_budget - used if char_budget else 0
+            text, stopped_at = tabulate(cells, min_row, sheet_format, budget)
+            used += len(text)
+            text += stopped_note(stopped_at)
+            sections.append((f"Sheet {n}: {name}", text.rstrip('\n')))
+            shown.append(n)
+    finally:
+        wb.close()
+    return Extraction(sections, 'sheet', total, shown, outline)
+
+
+def csv_rows(file, rows: str = "", columns: str = ""):
+    """
+    Lazily read a downloaded CSV file, keeping only the requested rows and
+    columns. Returns the row iterator and the number of its first row.
+    """
+    min_row, max_row = row_bounds(rows)
+    min_col, max_col = column_bounds(columns)
+    reader = csv.reader(
+        io.TextIOWrapper(file, encoding='utf-8', errors='replace', newline='')
+    )
+    selected = itertools.islice(reader, min_row - 1, max_row)
+    return (row[min_col - 1:max_col] for row in selected), min_row
+
+
+def svg_text(svg: str) -> str:
+    """Pull the text labels out of an exported Google Drawing."""
+    root = ElementTree.fromstring(svg)
+    labels = []
+    for element in root.iter():
+        if element.tag.rsplit('}', 1)[-1] == 'text':
+            label = "".join(element.itertext()).strip()
+            if label:
+                labels.append(label)
+    return "\n".join(labels)
+
+
+def extraction_options(
+    kind: str,
+    pages: str = "",
+    rows: str = "",
+    columns: str = "",
+    sheet_format: str = "tsv",
+    char_budget: int = 0,
+) -> dict:
+    """Pick the read_file_content arguments that affect extracting this kind of file."""
+    if kind in ('xlsx', 'gsheet'):
+        return {
+            'pages': pages,
+            'rows': rows,
+            'columns': columns,
+            'sheet_format': sheet_format,
+            'char_budget': char_budget,
+        }
+    if kind in ('pdf', 'pptx'):
+        return {'pages': pages}
+    return {}
+
+
+EXTRACTORS = {
+    'pdf': extract_pdf,
+    'docx': extract_docx,
+    'pptx': extract_pptx,
+    'xlsx': extract_xlsx,
+}
+
+
+def render(
+    name: str,
+    extraction: Extraction,
+    offset: int = 0,
+    max_chars: int = 0,
+    outline: bool = True,
+) -> str:
+    """
+    Return the requested character window of the extracted text. A header
+    with the totals and the outline is added so the caller can ask for other
+    parts, unless the whole of a non-paged document fits in the window.
+    """
+    body = extraction.text()
+    offset = max(0, offset)
+    end = min(len(body), offset + max_chars) if max_chars > 0 else len(body)
+    window = body[offset:end]
+
+    header = []
+    if extraction.unit is not None:
+        unit = extraction.unit
+        shown = format_ranges(extraction.selected) or "none"
+        header.append(f"{name}: {extraction.total} {unit}s. Showing {unit}s {shown}.")
+    if outline and extraction.outline:
+        header.append("Outline:")
+        header.extend(extraction.outline)
+    if offset > 0 or end < len(body):
+        header.append(
+            f"Characters {offset}-{end} of {len(body)}. "
+            "Pass offset to read further."
+        )
+
+    if not header:
+        return window
+    return "\n".join(header) + "\n\n" + window
+
+
+# Workers are started as fresh interpreters running this script, which only
+# imports this module. multiprocessing's spawn and forkserver children re-run
+# the parent's __main__ (server.py) and would build its caches in every worker.
+_WORKER_SCRIPT = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'extract_worker.py'
+)
+
+
+def worker_main(conn, memory_mb: int) -> None:
+    """Serve extraction jobs from the pool until the connection closes."""
+    if memory_mb > 0:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    while True:
+        try:
+            kind, path, options = conn.recv()
+        except EOFError:
+            return
+        try:
+            with open(path, 'rb') as file:
+                result = ('ok', EXTRACTORS[kind](file, **options))
+        except Exception as e:
+            result = ('error', f"{type(e).__name__}: {e}")
+        conn.send(result)
+
+
+class _Worker:
+    def __init__(self):
+        self.conn, child_conn = multiprocessing.Pipe()
+        fd = child_conn.fileno()
+        self.process = subprocess.Popen(
+            [sys.executable, _WORKER_SCRIPT, str(fd), str(DRIVE_EXTRACT_MEMORY_MB)],
+            pass_fds=(fd,),
+        )
+        child_conn.close()
+        self.jobs = 0
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def kill(self) -> None:
+        self.conn.close()
+        if self.alive():
+            self.process.kill()
+        self.process.wait()
+
+
+class ExtractionPool:
+    """
+    Long-lived parser processes, so the parsers are imported once per worker
+    rather than once per document. Each job has a worker to itself. Workers
+    that time out, crash or fail are killed and replaced, and healthy ones
+    are recycled after max_jobs documents to bound leaks.
+    """
+
+    def __init__(
+        self,
+        size: int = DRIVE_EXTRACT_WORKERS,
+        max_jobs: int = DRIVE_EXTRACT_MAX_JOBS,
+    ):
+        self.size = max(1, size)
+        self.max_jobs = max_jobs
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._idle: list[_Worker] = []
+        self._lock = threading.Lock()
+
+    def _checkout(self) -> _Worker:
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.alive():
+                    return worker
+                worker.kill()
+        return _Worker()
+
+    def _checkin(self, worker: _Worker, healthy: bool) -> None:
+        worker.jobs += 1
+        if healthy and worker.jobs < self.max_jobs and worker.alive():
+            with self._lock:
+                self._idle.append(worker)
+        else:
+            worker.kill()
+
+    def run(
+        self,
+        kind: str,
+        path: str,
+        options: dict,
+        timeout: float = DRIVE_EXTRACT_TIMEOUT,
+    ) -> Extraction:
+        """
+        Run EXTRACTORS[kind](file, **options) on the file at path in a worker
+        process. Blocks while every worker is busy. Raises ExtractionError if
+        the parser fails, crashes or runs past the timeout.
+        """
+        with self._slots:
+            worker = self._checkout()
+            status, result = 'error', None
+            try:
+                worker.conn.send((kind, path, options))
+                if not worker.conn.poll(timeout):
+                    raise ExtractionError(
+                        f"Text extraction timed out after {timeout:g} seconds."
+                    )
+                status, result = worker.conn.recv()
+            except (EOFError, OSError):
+                try:
+                    worker.process.wait(1)
+                except subprocess.TimeoutExpired:
+                    pass
+                raise ExtractionError(
+                    "Text extraction process exited unexpectedly "
+                    f"(exit code {worker.process.returncode})."
+                ) from None
+            finally:
+                self._checkin(worker, status == 'ok')
+
+        if status != 'ok':
+            raise ExtractionError(f"Text extraction failed: {result}")
+        return result
+
+
+extraction_pool = ExtractionPool()
@@ -0,0 +1,8 @@
+"""Entry point of the parser processes started by extract.ExtractionPool."""
+import sys
+from multiprocessing.connection import Connection
+
+import extract
+
+if __name__ == "__main__":
+    extract.worker_main(Connection(int(sys.argv[1])), int(sys.argv[2]))
@@ -0,0 +1,408 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from googleapiclient.errors import HttpError
+
+# SQLite database holding each account's file metadata.
+DRIVE_MIRROR_PATH = os.getenv(
+    "DRIVE_MIRROR_PATH", os.path.join(tempfile.gettempdir(), "drive-mirror.sqlite3")
+)
+# Folder listings are served from the mirror as long as it was synced with
+# Drive's change log at most this many seconds ago; otherwise the pending
+# changes are applied first.
+DRIVE_MIRROR_MAX_STALENESS = float(os.getenv("DRIVE_MIRROR_MAX_STALENESS", "60"))
+# After a failed seed, the account is served from Drive for this many seconds
+# before seeding is tried again.
+DRIVE_MIRROR_SEED_RETRY_INTERVAL = float(
+    os.getenv("DRIVE_MIRROR_SEED_RETRY_INTERVAL", "300")
+)
+DRIVE_MIRROR_ENABLED = os.getenv("DRIVE_MIRROR_ENABLED", "true").lower() == "true"
+
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+# File fields kept in the mirror. Requests for any other field go to Drive.
+MIRROR_FIELDS = (
+    'id', 'name', 'mimeType', 'modifiedTime', 'size', 'webViewLink', 'description'
+)
+_API_FIELDS = ", ".join(MIRROR_FIELDS + ('parents', 'trashed'))
+_CHANGE_FIELDS = (
+    f"nextPageToken, newStartPageToken, changes(fileId, removed, file({_API_FIELDS}))"
+)
+# Page tokens handed out for mirror results, to tell them from Drive's.
+PAGE_TOKEN_PREFIX = "mirror:"
+# Number of access tokens whose account ID is remembered.
+_ACCOUNT_CACHE_SIZE = 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS accounts (
+    account_id TEXT PRIMARY KEY,
+    root_id TEXT NOT NULL,
+    start_page_token TEXT NOT NULL,
+    synced_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    account_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    mimeType TEXT,
+    modifiedTime TEXT,
+    size TEXT,
+    webViewLink TEXT,
+    description TEXT,
+    PRIMARY KEY (account_id, id)
+);
+CREATE TABLE IF NOT EXISTS parents (
+    account_id TEXT NOT NULL,
+    parent_id TEXT NOT NULL,
+    file_id TEXT NOT NULL,
+    PRIMARY KEY (account_id, parent_id, file_id)
+);
+CREATE INDEX IF NOT EXISTS parents_by_file ON parents (account_id, file_id);
+"""
+
+_ORDER_COLUMNS = {
+    'folder': f"(mimeType = '{FOLDER_MIME_TYPE}')",
+    'name': "name COLLATE NOCASE",
+    'modifiedTime': "modifiedTime",
+}
+
+def _order_clause(order_by: str):
+    """Translate a Drive orderBy into SQL, or None if it can't be served."""
+    terms = []
+    for term in (order_by or "").split(','):
+        parts = term.split()
+        if not parts:
+            continue
+        if parts[0] not in _ORDER_COLUMNS or parts[1:] not in ([], ['asc'], ['desc']):
+            return None
+        descending = parts[1:] == ['desc']
+        # Drive lists folders first when sorting by 'folder' ascending.
+        if parts[0] == 'folder':
+            descending = not descending
+        terms.append(f"{_ORDER_COLUMNS[parts[0]]} {'DESC' if descending else 'ASC'}")
+    terms.append("id")
+    return ", ".join(terms)
+
+
+def _offset(page_token: str):
+    """Return the row offset of a mirror page token, 0 for none, or None for Drive's."""
+    if not page_token:
+        return 0
+    offset = page_token[len(PAGE_TOKEN_PREFIX):]
+    if page_token.startswith(PAGE_TOKEN_PREFIX) and offset.isdigit():
+        return int(offset)
+    return None
+
+
+class DriveMirror:
+    """
+    Per-account copy of Drive file metadata in SQLite.
+
+    An account is seeded in the background the first time it is seen, with
+    the change log position recorded beforehand. After that, folder listings
+    are answered locally, applying Drive's changes.list first if the last sync
+    is older than the caller's staleness bound. Anything the mirror can't
+    answer returns None so the caller queries Drive directly. Name searches
+    always go to Drive: 'name contains' matches word prefixes by Drive's own
+    tokenization, which a substring match would only approximate.
+    """
+
+    def __init__(self, service, authorize, path: str = DRIVE_MIRROR_PATH):
+        self._service = service
+        self._authorize = authorize
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._accounts: OrderedDict[str, str] = OrderedDict()
+        self._sync_locks: dict[str, threading.Lock] = {}
+        self._seeding: set[str] = set()
+        self._seed_failed_at: dict[str, float] = {}
+        self.counters = Counter()
+        self._db().executescript(_SCHEMA)
+
+    def _db(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared between threads.
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.path, timeout=30)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    def _account_id(self, token: str) -> str:
+        token_hash = hashlib.sha256(token.encode()).hexdigest()
+        with self._lock:
+            account_id = self._accounts.get(token_hash)
+            if account_id is not None:
+                self._accounts.move_to_end(token_hash)
+                return account_id
+
+        about = self._service().about().get(fields="user(permissionId)").execute(
+            http=self._authorize(token)
+        )
+        account_id = about['user']['permissionId']
+        with self._lock:
+            self._accounts[token_hash] = account_id
+            while len(self._accounts) > _ACCOUNT_CACHE_SIZE:
+                self._accounts.popitem(last=False)
+        return account_id
+
+    def _store(self, db: sqlite3.Connection, account_id: str, file: dict) -> None:
+        db.execute(
+            f"INSERT OR REPLACE INTO files (account_id, {', '.join(MIRROR_FIELDS)}) "
+            f"VALUES (?{', ?' * len(MIRROR_FIELDS)})",
+            (account_id, *(file.get(field) for field in MIRROR_FIELDS)),
+        )
+        db.execute(
+            "DELETE FROM parents WHERE account_id = ? AND file_id = ?",
+            (account_id, file['id']),
+        )
+        db.executemany(
+            "INSERT OR IGNORE INTO parents (account_id, parent_id, file_id) "
+            "VALUES (?, ?, ?)",
+            [(account_id, parent, file['id']) for parent in file.get('parents', [])],
+        )
+
+    def _remove(self, db: sqlite3.Connection, account_id: str, file_id: str) -> None:
+        db.execute(
+            "DELETE FROM files WHERE account_id = ? AND id = ?", (account_id, file_id)
+        )
+        db.execute(
+            "DELETE FROM parents WHERE account_id = ? AND file_id = ?",
+            (account_id, file_id),
+        )
+
+    def _seed(self, account_id: str, token: str) -> None:
+        try:
+            service = self._service()
+            http = self._authorize(token)
+            # Record the change log position first so nothing that changes
+            # while the listing runs is missed.
+            start = service.changes().getStartPageToken().execute(http=http)
+            start = start['startPageToken']
+            root = service.files().get(fileId='root', fields='id').execute(http=http)
+            root_id = root['id']
+
+            db = self._db()
+            with db:
+                db.execute("DELETE FROM accounts WHERE account_id = ?", (account_id,))
+                db.execute("DELETE FROM files WHERE account_id = ?", (account_id,))
+                db.execute("DELETE FROM parents WHERE account_id = ?", (account_id,))
+
+            count = 0
+            page_token = None
+            while True:
+                results = service.files().list(
+                    q="trashed = false",
+                    pageSize=1000,
+                    pageToken=page_token,
+                    fields=f"nextPageToken, files({_API_FIELDS})",
+                ).execute(http=http)
+                # The account row is written last, so a partly seeded mirror
+                # is never read.
+                with db:
+                    for file in results.get('files', []):
+                        self._store(db, account_id, file)
+                count += len(results.get('files', []))
+                page_token = results.get('nextPageToken')
+                if not page_token:
+                    break
+
+            with db:
+                # synced_at = 0 makes the first read apply the changes made
+                # while seeding.
+                db.execute(
+                    "INSERT INTO accounts "
+                    "(account_id, root_id, start_page_token, synced_at) "
+                    "VALUES (?, ?, ?, 0)",
+                    (account_id, root_id, start),
+                )
+            with self._lock:
+                self._seed_failed_at.pop(account_id, None)
+            self.counters['seeds'] += 1
+            print(f"Seeded Drive mirror for account {account_id} with {count} files")
+        except Exception as e:
+            print(f"Failed to seed Drive mirror for account {account_id}: {e}")
+            self.counters['seed_failures'] += 1
+            with self._lock:
+                self._seed_failed_at[account_id] = time.time()
+        finally:
+            with self._lock:
+                self._seeding.discard(account_id)
+
+    def _seed_in_background(self, account_id: str, token: str) -> None:
+        with self._lock:
+            if account_id in self._seeding:
+                return
+            failed_at = self._seed_failed_at.get(account_id, 0)
+            if time.time() - failed_at < DRIVE_MIRROR_SEED_RETRY_INTERVAL:
+                return
+            self._seeding.add(account_id)
+        threading.Thread(
+            target=self._seed, args=(account_id, token), daemon=True
+        ).start()
+
+    def _sync(self, account_id: str, token: str, max_staleness: float) -> bool:
+        """
+        Apply pending changes unless another thread just did. Returns False if
+        the mirror had to be dropped.
+        """
+        with self._lock:
+            sync_lock = self._sync_locks.setdefault(account_id, threading.Lock())
+        with sync_lock:
+            db = self._db()
+            row = db.execute(
+                "SELECT start_page_token, synced_at FROM accounts WHERE account_id = ?",
+                (account_id,),
+            ).fetchone()
+            if row is None:
+                return False
+            if time.time() - row['synced_at'] <= max_staleness:
+                return True
+
+            service = self._service()
+            http = self._authorize(token)
+            changes = []
+            page_token = row['start_page_token']
+            try:
+                while True:
+                    results = service.changes().list(
+                        pageToken=page_token,
+                        pageSize=1000,
+                        includeRemoved=True,
+                        spaces='drive',
+                        fields=_CHANGE_FIELDS,
+                    ).execute(http=http)
+                    changes.extend(results.get('changes', []))
+                    if 'newStartPageToken' in results:
+                        page_token = results['newStartPageToken']
+                        break
+                    page_token = results['nextPageToken']
+            except HttpError as e:
+                # An expired change log position can't be caught up; reseed.
+                if e.resp.status in (400, 404, 410):
+                    with db:
+                        db.execute(
+                            "DELETE FROM accounts WHERE account_id = ?", (account_id,)
+                        )
+                    self._seed_in_background(account_id, token)
+                    return False
+                raise
+
+            with db:
+                for change in changes:
+                    file = change.get('file')
+                    if change.get('removed') or file is None or file.get('trashed'):
+                        self._remove(db, account_id, change['fileId'])
+                    else:
+                        self._store(db, account_id, file)
+                db.execute(
+                    "UPDATE accounts SET start_page_token = ?, synced_at = ? "
+                    "WHERE account_id = ?",
+                    (page_token, time.time(), account_id),
+                )
+            self.counters['syncs'] += 1
+            self.counters['changes_applied'] += len(changes)
+            return True
+
+    def _ready_account(self, token: str, max_staleness: float):
+        """Return the caller's account ID once its mirror is fresh enough, or None."""
+        account_id = self._account_id(token)
+        row = self._db().execute(
+            "SELECT 1 FROM accounts WHERE account_id = ?", (account_id,)
+        ).fetchone()
+        if row is None:
+            self._seed_in_background(account_id, token)
+            return None
+        if not self._sync(account_id, token, max_staleness):
+            return None
+        return account_id
+
+    def _query(
+        self, token, where, params, order_by, page_size, page_token, fields,
+        max_staleness,
+    ):
+        order = _order_clause(order_by)
+        offset = _offset(page_token)
+        if (
+            not DRIVE_MIRROR_ENABLED
+            or order is None
+            or offset is None
+            or not set(fields) <= set(MIRROR_FIELDS)
+        ):
+            return None
+        try:
+            account_id = self._ready_account(token, max_staleness)
+            if account_id is None:
+                self.counters['fallbacks'] += 1
+                return None
+
+            db = self._db()
+            if callable(where):
+                clause = where(db, account_id)
+                if clause is None:
+                    self.counters['fallbacks'] += 1
+                    return None
+                where, params = clause
+            rows = db.execute(
+                f"SELECT {', '.join(fields)} FROM files "
+                f"WHERE account_id = ? AND {where} "
+                f"ORDER BY {order} LIMIT ? OFFSET ?",
+                (account_id, *params, page_size + 1, offset),
+            ).fetchall()
+        except Exception as e:
+            print(f"Drive mirror unavailable, querying Drive directly: {e}")
+            self.counters['fallbacks'] += 1
+            return None
+
+        self.counters['served'] += 1
+        files = [
+            {field: row[field] for field in fields if row[field] is not None}
+            for row in rows[:page_size]
+        ]
+        next_page_token = None
+        if len(rows) > page_size:
+            next_page_token = f"{PAGE_TOKEN_PREFIX}{offset + page_size}"
+        return json.dumps({"files": files, "next_page_token": next_page_token})
+
+    def list_folder(
+        self, token, folder_id, order_by, page_size, page_token, fields,
+        max_staleness=DRIVE_MIRROR_MAX_STALENESS,
+    ):
+        """Return a list_files page from the mirror, or None to query Drive."""
+        def folder_filter(db, account_id):
+            parent_id = folder_id
+            if folder_id == 'root':
+                parent_id = db.execute(
+                    "SELECT root_id FROM accounts WHERE account_id = ?", (account_id,)
+                ).fetchone()['root_id']
+            elif db.execute(
+                "SELECT 1 FROM files WHERE account_id = ? AND id = ?",
+                (account_id, folder_id),
+            ).fetchone() is None:
+                # Unknown or inaccessible folders get Drive's own not-found error.
+                return None
+            return (
+                "id IN (SELECT file_id FROM parents "
+                "WHERE account_id = ? AND parent_id = ?)",
+                (account_id, parent_id),
+            )
+
+        return self._query(
+            token, folder_filter, (), order_by, page_size, page_token, fields,
+            max_staleness,
+        )
+
+    def stats(self) -> dict:
+        db = self._db()
+        return {
+            "accounts": db.execute("SELECT COUNT(*) FROM accounts").fetchone()[0],
+            "files": db.execute("SELECT COUNT(*) FROM files").fetchone()[0],
+            "seeding": len(self._seeding),
+            **self.counters,
+        }
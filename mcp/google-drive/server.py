@@ -1,214 +1,822 @@
 from mcp.server.fastmcp import FastMCP
+import concurrent.futures
+import functools
+import threading
+import anyio
 import os
-import io
+import codecs
+import contextlib
+import tempfile
+import httplib2
+import google_auth_httplib2
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload, MediaIoBaseUpload
-from pypdf import PdfReader
-from docx import Document
-from pptx import Presentation
-import openpyxl
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest, MediaIoBaseDownload, MediaIoBaseUpload
 import json
+from starlette.responses import JSONResponse
+import extract
+from text_cache import file_version, text_cache
+from mirror import DRIVE_MIRROR_MAX_STALENESS, PAGE_TOKEN_PREFIX, DriveMirror
 mcp = FastMCP("google-drive", host="0.0.0.0", port=8080)
 
+# Tool bodies make blocking API calls, so they run on worker threads instead
+# of the event loop. This caps how many run at once in this server process.
+MCP_MAX_CONCURRENCY = int(os.getenv("MCP_MAX_CONCURRENCY", "16"))
+_tool_limiter = anyio.CapacityLimiter(MCP_MAX_CONCURRENCY)
+
+
+def run_in_thread(func):
+    """Run a blocking tool on a worker thread, keeping the server responsive."""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await anyio.to_thread.run_sync(
+            functools.partial(func, *args, **kwargs), limiter=_tool_limiter
+        )
+    return wrapper
+
+
 import json
 
 # ... imports ...
 
+# Downloads stop after this many bytes. Larger text files are returned
+# truncated; larger documents that have to be parsed whole are rejected.
+DRIVE_MAX_DOWNLOAD_BYTES = int(
+    os.getenv("DRIVE_MAX_DOWNLOAD_BYTES", str(50 * 1024 * 1024))
+)
+# Size of each ranged request made while downloading a file.
+DRIVE_DOWNLOAD_CHUNK_BYTES = int(
+    os.getenv("DRIVE_DOWNLOAD_CHUNK_BYTES", str(8 * 1024 * 1024))
+)
+# Downloads are buffered in memory up to this size and spill to a temp file
+# beyond it.
+DRIVE_SPOOL_BYTES = int(os.getenv("DRIVE_SPOOL_BYTES", str(4 * 1024 * 1024)))
+# Default and maximum number of files list_files and search_files return per
+# call. Drive itself allows at most 1000.
+DRIVE_LIST_PAGE_SIZE = int(os.getenv("DRIVE_LIST_PAGE_SIZE", "100"))
+DRIVE_LIST_MAX_PAGE_SIZE = min(1000, int(os.getenv("DRIVE_LIST_MAX_PAGE_SIZE", "1000")))
+# Limits on how much of a folder hierarchy one list_tree call may walk.
+DRIVE_TREE_MAX_DEPTH = int(os.getenv("DRIVE_TREE_MAX_DEPTH", "10"))
+DRIVE_TREE_MAX_NODES = int(os.getenv("DRIVE_TREE_MAX_NODES", "2000"))
+# Drive accepts at most 100 calls in one batch request.
+DRIVE_BATCH_SIZE = 100
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+# File fields returned when the caller doesn't choose any.
+DRIVE_FILE_FIELDS = "id, name, mimeType, modifiedTime, size, webViewLink, description"
+# Default number of characters read_file_content returns per call.
+DRIVE_READ_MAX_CHARS = int(os.getenv("DRIVE_READ_MAX_CHARS", "100000"))
+
+# Google-native files are read through a server-side export instead of being
+# converted to Office formats and parsed locally.
+GOOGLE_EXPORT_FORMATS = {
+    'application/vnd.google-apps.document': 'text/plain',
+    'application/vnd.google-apps.presentation': 'text/plain',
+    'application/vnd.google-apps.drawing': 'image/svg+xml',
+}
+SPREADSHEET_MIME_TYPE = 'application/vnd.google-apps.spreadsheet'
+# Drive's own export only returns the first sheet; this one takes any sheet.
+SHEET_EXPORT_URL = "https://docs.google.com/spreadsheets/d/{file_id}/export?format=csv&gid={gid}"
+# Metadata read_file_content needs to pick an extraction path and cache key.
+READ_METADATA_FIELDS = (
+    "id, name, mimeType, size, md5Checksum, headRevisionId, modifiedTime"
+)
+# read_files reads at most this many files per call, this many at a time,
+# and splits this many download bytes between them.
+DRIVE_READ_FILES_MAX_FILES = int(os.getenv("DRIVE_READ_FILES_MAX_FILES", "20"))
+DRIVE_READ_FILES_WORKERS = int(os.getenv("DRIVE_READ_FILES_WORKERS", "4"))
+DRIVE_READ_FILES_MAX_BYTES = int(
+    os.getenv("DRIVE_READ_FILES_MAX_BYTES", str(100 * 1024 * 1024))
+)
+SHEET_FIELDS = "sheets.properties(sheetId,title,gridProperties(rowCount,columnCount))"
+
+_thread_local = threading.local()
+
+
+@functools.lru_cache(maxsize=1)
+def _drive_service():
+    """
+    Build the Drive service once from the discovery document bundled with
+    googleapiclient. Requests are authorized per call with _authorized_http().
+    """
+    return build(
+        'drive',
+        'v3',
+        http=httplib2.Http(),
+        static_discovery=True,
+        cache_discovery=False,
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _sheets_service():
+    """Build the Sheets service, used to list the sheets of a spreadsheet."""
+    return build(
+        'sheets',
+        'v4',
+        http=httplib2.Http(),
+        static_discovery=True,
+        cache_discovery=False,
+    )
+
+
+def _authorized_http(token: str):
+    """
+    Return an HTTP client that sends the caller's token over this worker
+    thread's connection pool. httplib2.Http is not thread-safe, so each thread
+    keeps its own and reuses it across calls.
+    """
+    http = getattr(_thread_local, 'http', None)
+    if http is None:
+        http = _thread_local.http = httplib2.Http()
+    return google_auth_httplib2.AuthorizedHttp(Credentials(token=token), http=http)
+
+
+mirror = DriveMirror(_drive_service, _authorized_http)
+# Shared by read_files calls so worker threads keep their HTTP connections.
+_read_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=DRIVE_READ_FILES_WORKERS, thread_name_prefix="drive-read"
+)
+
+
+@contextlib.contextmanager
+def _download(
+    request, http, max_bytes: int = DRIVE_MAX_DOWNLOAD_BYTES, named: bool = False
+):
+    """
+    Stream a media request into a spooled temp file, stopping once max_bytes
+    have been received. Yields the rewound file and whether it was cut short.
+    With named=True the file is always on disk, so other processes can open
+    it by name.
+    """
+    request.http = http
+    if named:
+        temp_file = tempfile.NamedTemporaryFile()
+    else:
+        temp_file = tempfile.SpooledTemporaryFile(max_size=DRIVE_SPOOL_BYTES)
+    with temp_file as file:
+        chunk_size = max(1, min(DRIVE_DOWNLOAD_CHUNK_BYTES, max_bytes))
+        downloader = MediaIoBaseDownload(file, request, chunksize=chunk_size)
+        done = False
+        truncated = False
+        while done is False:
+            if file.tell() >= max_bytes:
+                truncated = True
+                break
+            status, done = downloader.next_chunk()
+        # Exports ignore range requests and may return more than was asked for.
+        if file.tell() > max_bytes:
+            truncated = True
+            file.truncate(max_bytes)
+        file.flush()
+        file.seek(0)
+        yield file, truncated
+
+
+# Formats that need a parser, by MIME type. Each is also recognized by its
+# kind as the file extension.
+_DOCUMENT_KINDS = {
+    'application/pdf': 'pdf',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document': 'docx',
+    'application/vnd.openxmlformats-officedocument.presentationml.presentation': 'pptx',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': 'xlsx',
+}
+
+
+def _document_kind(mime_type: str, file_name: str):
+    """Return the parser needed for a file, or None for plain text."""
+    for kind_mime_type, kind in _DOCUMENT_KINDS.items():
+        if mime_type == kind_mime_type or file_name.endswith(f'.{kind}'):
+            return kind
+    return None
+
+
+class UnreadableFileError(Exception):
+    """A file that can't be turned into text, with a message for the caller."""
+
+
+def _too_large(
+    file_name: str, size, max_bytes: int = DRIVE_MAX_DOWNLOAD_BYTES
+) -> UnreadableFileError:
+    size_text = f"{size} bytes" if size is not None else "larger than the limit"
+    return UnreadableFileError(
+        f"File '{file_name}' is {size_text}. Files that need text extraction "
+        f"are limited to {max_bytes} bytes."
+    )
+
+
+def _decode_text(
+    file, truncated: bool, size, max_bytes: int = DRIVE_MAX_DOWNLOAD_BYTES
+):
+    """Decode a downloaded text file, or return None if it is not UTF-8."""
+    # An incremental decoder drops a multi-byte character split by truncation.
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        text = decoder.decode(file.read(), final=not truncated)
+    except UnicodeDecodeError:
+        return None
+    if truncated:
+        of_total = f" of {size}" if size is not None else ""
+        text += (
+            f"\n\n[Truncated: only the first {max_bytes}{of_total} bytes were read.]"
+        )
+    return text
+
+def _sheet_properties(http, file_id: str):
+    """
+    Return the properties of every sheet in a spreadsheet, or None if the
+    Sheets API can't be used (for example, when it isn't enabled).
+    """
+    try:
+        spreadsheet = _sheets_service().spreadsheets().get(
+            spreadsheetId=file_id, fields=SHEET_FIELDS
+        ).execute(http=http)
+    except HttpError as e:
+        if e.resp.status == 404:
+            raise
+        print(
+            f"Listing sheets of {file_id} failed, exporting the first sheet only: {e}"
+        )
+        return None
+    return [sheet['properties'] for sheet in spreadsheet.get('sheets', [])]
+
+
+def _read_spreadsheet(
+    service,
+    http,
+    file_id: str,
+    pages: str,
+    rows: str,
+    columns: str,
+    sheet_format: str,
+    char_budget: int,
+    max_bytes: int = DRIVE_MAX_DOWNLOAD_BYTES,
+):
+    """
+    Export each selected sheet of a Google Sheets file as CSV and keep the
+    requested rows and columns, in the same layout extract_xlsx produces.
+    Each export is capped at max_bytes, and sheets stop being
+    exported once char_budget characters (0 for no limit) have been produced.
+    """
+    sheets = _sheet_properties(http, file_id)
+    if sheets is None:
+        sheets = [{'title': 'Sheet1'}]
+    total = len(sheets)
+    selected = extract.parse_ranges(pages, total)
+    outline = []
+    for n, sheet in enumerate(sheets[:extract.OUTLINE_MAX_ITEMS], start=1):
+        grid = sheet.get('gridProperties')
+        size = "size unknown"
+        if grid:
+            size = (
+                f"{grid.get('rowCount', 0)} rows x "
+                f"{grid.get('columnCount', 0)} columns"
+            )
+        outline.append(f"- Sheet {n}: {sheet['title']} ({size})")
+
+    sections = []
+    shown = []
+    used = 0
+    for n in selected:
+        if char_budget and used >= char_budget:
+            break
+        sheet = sheets[n - 1]
+        if 'sheetId' in sheet:
+            uri = SHEET_EXPORT_URL.format(file_id=file_id, gid=sheet['sheetId'])
+            request = HttpRequest(http, None, uri, headers={})
+        else:
+            request = service.files().export_media(fileId=file_id, mimeType='text/csv')
+        with _download(request, http, max_bytes) as (file, truncated):
+            cells, first_row = extract.csv_rows(file, rows, columns)
+            budget = char_budget - used if char_budget else 0
+            text, stopped_at = extract.tabulate(cells, first_row, sheet_format, budget)
+        used += len(text)
+        text += extract.stopped_note(stopped_at)
+        if truncated and stopped_at is None:
+            text += (
+                "[Sheet export cut off at the download limit. "
+                "Pass rows to read a later range.]"
+            )
+        sections.append((f"Sheet {n}: {sheet['title']}", text.rstrip('\n')))
+        shown.append(n)
+    return extract.Extraction(sections, 'sheet', total, shown, outline)
+
+
+def _requested_fields(fields: str) -> list[str]:
+    names = (fields or DRIVE_FILE_FIELDS).split(',')
+    requested = [field.strip() for field in names if field.strip()]
+    # The id is always needed to do anything further with a file.
+    if 'id' not in requested:
+        requested.insert(0, 'id')
+    return requested
+
+
+def _list_page(
+    token: str,
+    q: str,
+    order_by: str,
+    page_size: int,
+    page_token: str,
+    requested: list[str],
+) -> str:
+    """Fetch one page of files.list results as {"files", "next_page_token"}."""
+    if page_token.startswith(PAGE_TOKEN_PREFIX):
+        raise ValueError(
+            "This page token is no longer valid; list again without page_token."
+        )
+    results = _drive_service().files().list(
+        q=q,
+        pageSize=page_size,
+        pageToken=page_token or None,
+        orderBy=order_by,
+        fields=f"nextPageToken, files({', '.join(requested)})"
+    ).execute(http=_authorized_http(token))
+
+    return json.dumps({
+        "files": results.get('files', []),
+        "next_page_token": results.get('nextPageToken'),
+    })
+
 @mcp.tool()
-def list_files(token: str, folder_id: str = 'root', order_by: str = 'folder,name') -> str:
+@run_in_thread
+def list_files(
+    token: str,
+    folder_id: str = 'root',
+    order_by: str = 'folder,name',
+    page_size: int = DRIVE_LIST_PAGE_SIZE,
+    page_token: str = "",
+    fields: str = "",
+    max_staleness: float = DRIVE_MIRROR_MAX_STALENESS,
+) -> str:
     """
-    List ALL files from a Google Drive folder. Returns a JSON string.
+    List files in a Google Drive folder, one page at a time. Returns a JSON
+    object with "files" and "next_page_token"; pass next_page_token back as
+    page_token to get the next page. It is null on the last page.
     
     Args:
         token: The OAuth2 access token for the user.
         folder_id: The ID of the folder to list files from (default: 'root').
         order_by: Sort order (e.g., 'folder,name', 'modifiedTime desc').
+        page_size: Number of files per page (at most 1000).
+        page_token: Cursor returned by a previous call.
+        fields: Comma-separated file fields to return (e.g. 'id, name, mimeType').
+                Default: id, name, mimeType, modifiedTime, size, webViewLink,
+                description.
+        max_staleness: How many seconds out of date cached metadata may be.
+                       Use 0 to catch up with Drive first.
     """
     try:
-        creds = Credentials(token=token)
-        service = build('drive', 'v3', credentials=creds)
+        page_size = max(1, min(page_size, DRIVE_LIST_MAX_PAGE_SIZE))
+        requested = _requested_fields(fields)
+        mirrored = mirror.list_folder(
+            token, folder_id, order_by, page_size, page_token, requested, max_staleness
+        )
+        if mirrored is not None:
+            return mirrored
 
-        all_files = []
-        page_token = None
-        
-        while True:
-            q = f"'{folder_id}' in parents and trashed = false"
-            results = service.files().list(
-                q=q, 
-                pageSize=1000, 
-                pageToken=page_token,
-                orderBy=order_by,
-                fields="nextPageToken, files(id, name, mimeType, modifiedTime, size, webViewLink, description)"
-            ).execute()
-            
-            files = results.get('files', [])
-            all_files.extend(files)
-            
-            page_token = results.get('nextPageToken')
-            if not page_token:
-                break
-        
-        return json.dumps(all_files)
+        q = f"'{folder_id}' in parents and trashed = false"
+        return _list_page(token, q, order_by, page_size, page_token, requested)
     except Exception as e:
         return json.dumps({"error": str(e)})
 
 @mcp.tool()
-def search_files(token: str, query: str, order_by: str = 'folder,name') -> str:
+@run_in_thread
+def search_files(
+    token: str,
+    query: str,
+    order_by: str = 'folder,name',
+    page_size: int = DRIVE_LIST_PAGE_SIZE,
+    page_token: str = "",
+    fields: str = "",
+) -> str:
     """
-    Search for ALL matching files in Google Drive. Returns a JSON string.
+    Search for files in Google Drive, one page at a time. Returns a JSON
+    object with "files" and "next_page_token"; pass next_page_token back as
+    page_token to get the next page. It is null on the last page.
     
     Args:
         token: The OAuth2 access token for the user.
         query: The search query (e.g., "name contains 'report'", "fullText contains 'budget'").
                Note: 'trashed = false' is automatically appended to the query.
         order_by: Sort order.
+        page_size: Number of files per page (at most 1000).
+        page_token: Cursor returned by a previous call.
+        fields: Comma-separated file fields to return (e.g. 'id, name, mimeType').
+                Default: id, name, mimeType, modifiedTime, size, webViewLink,
+                description.
     """
     try:
-        creds = Credentials(token=token)
-        service = build('drive', 'v3', credentials=creds)
-
-        all_files = []
-        page_token = None
-        
+        page_size = max(1, min(page_size, DRIVE_LIST_MAX_PAGE_SIZE))
+        requested = _requested_fields(fields)
         # Enforce trashed = false if not present
         if "trashed" not in query:
             query = f"({query}) and trashed = false"
+        return _list_page(token, query, order_by, page_size, page_token, requested)
+    except Exception as e:
+        return json.dumps({"error": str(e)})
 
-        while True:
-            results = service.files().list(
-                q=query, 
-                pageSize=1000, 
-                pageToken=page_token,
-                orderBy=order_by,
-                fields="nextPageToken, files(id, name, mimeType, modifiedTime, size, webViewLink, description)"
-            ).execute()
-            
-            files = results.get('files', [])
-            all_files.extend(files)
-            
-            page_token = results.get('nextPageToken')
-            if not page_token:
+def _list_children_batched(service, http, pages: dict, include_files: bool) -> dict:
+    """
+    List one page of children for each folder in pages (folder ID -> page
+    token) using Drive batch requests. Returns folder ID -> response or
+    exception.
+    """
+    results = {}
+
+    def on_response(request_id, response, exception):
+        results[request_id] = exception if exception is not None else response
+
+    folder_ids = list(pages)
+    for start in range(0, len(folder_ids), DRIVE_BATCH_SIZE):
+        batch = service.new_batch_http_request(callback=on_response)
+        for folder_id in folder_ids[start:start + DRIVE_BATCH_SIZE]:
+            q = f"'{folder_id}' in parents and trashed = false"
+            if not include_files:
+                q += f" and mimeType = '{FOLDER_MIME_TYPE}'"
+            batch.add(
+                service.files().list(
+                    q=q,
+                    pageSize=1000,
+                    pageToken=pages[folder_id],
+                    orderBy='folder,name',
+                    fields="nextPageToken, files(id, name, mimeType)",
+                ),
+                request_id=folder_id,
+            )
+        batch.execute(http=http)
+    return results
+
+@mcp.tool()
+@run_in_thread
+def list_tree(
+    token: str,
+    folder_id: str = 'root',
+    max_depth: int = 3,
+    max_nodes: int = 500,
+    include_files: bool = True,
+) -> str:
+    """
+    List a Google Drive folder and its subfolders, down to max_depth levels,
+    in one call. Returns an indented tree with one item per line as
+    'name (id)', with folders marked by a trailing '/'.
+    
+    Args:
+        token: The OAuth2 access token for the user.
+        folder_id: The ID of the folder to start from (default: 'root').
+        max_depth: How many levels below the folder to list (at most 10).
+        max_nodes: Maximum number of items to return (at most 2000).
+        include_files: List files as well as folders.
+    """
+    try:
+        service = _drive_service()
+        http = _authorized_http(token)
+        max_depth = max(1, min(max_depth, DRIVE_TREE_MAX_DEPTH))
+        max_nodes = max(1, min(max_nodes, DRIVE_TREE_MAX_NODES))
+
+        top = service.files().get(fileId=folder_id, fields="id, name")
+        top = top.execute(http=http)
+        children = {}
+        errors = {}
+        seen = {top['id']}
+        count = 0
+        truncated = False
+        # The folder whose listing was cut short by max_nodes, if any.
+        partial = None
+
+        # Walk breadth-first; all folders on one level are listed together.
+        level = [top['id']]
+        for _ in range(max_depth):
+            pages = dict.fromkeys(level)
+            found = {folder: [] for folder in level}
+            while pages:
+                responses = _list_children_batched(service, http, pages, include_files)
+                pages = {}
+                for folder, response in responses.items():
+                    if isinstance(response, Exception):
+                        errors[folder] = str(response)
+                        continue
+                    found[folder].extend(response.get('files', []))
+                    if response.get('nextPageToken'):
+                        pages[folder] = response['nextPageToken']
+
+            next_level = []
+            for folder in level:
+                kept = []
+                for item in found[folder]:
+                    if item['id'] in seen:
+                        continue
+                    if count >= max_nodes:
+                        truncated = True
+                        break
+                    seen.add(item['id'])
+                    kept.append(item)
+                    count += 1
+                    if item.get('mimeType') == FOLDER_MIME_TYPE:
+                        next_level.append(item['id'])
+                # Folders after the cut-off stay unexpanded rather than
+                # looking empty.
+                if truncated and not kept:
+                    break
+                children[folder] = kept
+                if truncated:
+                    partial = folder
+                    break
+            if truncated or not next_level:
                 break
-        
-        return json.dumps(all_files)
+            level = next_level
+
+        lines = []
+
+        def render(item, depth):
+            is_folder = item.get('mimeType', FOLDER_MIME_TYPE) == FOLDER_MIME_TYPE
+            folder_mark = '/' if is_folder else ''
+            note = ""
+            if item['id'] in errors:
+                note = f" [error: {errors[item['id']]}]"
+            elif folder_mark and item['id'] not in children:
+                note = " [not expanded]"
+            elif item['id'] == partial:
+                note = " [more items not shown]"
+            lines.append(
+                f"{'  ' * depth}{item['name']}{folder_mark} ({item['id']}){note}"
+            )
+            for child in children.get(item['id'], []):
+                render(child, depth + 1)
+
+        render(top, 0)
+        if truncated:
+            lines.append(
+                f"[Stopped after {max_nodes} items. "
+                "List a subfolder or raise max_nodes to see more.]"
+            )
+        return "\n".join(lines)
     except Exception as e:
         return json.dumps({"error": str(e)})
 
+
+def _read_file(
+    service,
+    http,
+    file_metadata: dict,
+    pages: str = "",
+    offset: int = 0,
+    max_chars: int = DRIVE_READ_MAX_CHARS,
+    outline: bool = True,
+    rows: str = "",
+    columns: str = "",
+    sheet_format: str = "tsv",
+    max_bytes: int = DRIVE_MAX_DOWNLOAD_BYTES,
+) -> str:
+    """
+    Download and extract a file whose metadata the caller has already fetched
+    with READ_METADATA_FIELDS. Raises UnreadableFileError for files that can't
+    be turned into text.
+    """
+    file_id = file_metadata['id']
+    mime_type = file_metadata.get('mimeType')
+    file_name = file_metadata.get('name', '').lower()
+    # Google Docs exports have no size until they are generated.
+    size = int(file_metadata['size']) if 'size' in file_metadata else None
+
+    if mime_type == SPREADSHEET_MIME_TYPE:
+        request = None
+        kind = 'gsheet'
+    elif mime_type in GOOGLE_EXPORT_FORMATS:
+        # Export Google Docs, Slides and Drawings as text
+        request = service.files().export_media(
+            fileId=file_id, mimeType=GOOGLE_EXPORT_FORMATS[mime_type]
+        )
+        kind = None
+    else:
+        request = service.files().get_media(fileId=file_id)
+        kind = _document_kind(mime_type, file_name)
+
+    # Unchanged files are served from the text cache without downloading.
+    version = file_version(file_metadata)
+    options = extract.extraction_options(
+        kind,
+        pages=pages,
+        rows=rows,
+        columns=columns,
+        sheet_format=sheet_format,
+        char_budget=offset + max_chars if max_chars > 0 else 0,
+    )
+    cache_key = json.dumps(options, sort_keys=True)
+    # Text and sheet exports cut short by a smaller download limit are cached apart.
+    if kind in (None, 'gsheet') and max_bytes != DRIVE_MAX_DOWNLOAD_BYTES:
+        cache_key += f" max_bytes={max_bytes}"
+    extraction = text_cache.get(file_id, version, cache_key)
+    if extraction is None and kind == 'gsheet':
+        extraction = _read_spreadsheet(
+            service, http, file_id, max_bytes=max_bytes, **options
+        )
+        text_cache.put(file_id, version, cache_key, extraction)
+    elif extraction is None:
+        # Documents are parsed whole, so don't download ones over the limit.
+        if kind is not None and size is not None and size > max_bytes:
+            raise _too_large(file_metadata.get('name', ''), size, max_bytes)
+
+        download = _download(request, http, max_bytes, named=kind is not None)
+        with download as (file, truncated):
+            if kind is None:
+                # Assume text-based file (txt, json, csv, Google Docs, etc.)
+                text = _decode_text(file, truncated, size, max_bytes)
+                if text is None:
+                    raise UnreadableFileError(
+                        f"File type '{mime_type}' is not supported for text "
+                        "extraction, and could not be decoded as UTF-8 text."
+                    )
+                if mime_type == 'application/vnd.google-apps.drawing':
+                    text = extract.svg_text(text)
+                extraction = extract.Extraction([("", text)])
+            elif truncated:
+                raise _too_large(file_metadata.get('name', ''), size, max_bytes)
+            else:
+                extraction = extract.extraction_pool.run(kind, file.name, options)
+        text_cache.put(file_id, version, cache_key, extraction)
+
+    return extract.render(
+        file_metadata.get('name', ''),
+        extraction,
+        offset=offset,
+        max_chars=max_chars,
+        outline=outline,
+    )
+
+
 @mcp.tool()
-def read_file_content(token: str, file_id: str) -> str:
+@run_in_thread
+def read_file_content(
+    token: str,
+    file_id: str,
+    pages: str = "",
+    offset: int = 0,
+    max_chars: int = DRIVE_READ_MAX_CHARS,
+    outline: bool = True,
+    rows: str = "",
+    columns: str = "",
+    sheet_format: str = "tsv",
+) -> str:
     """
     Read the content of a file from Google Drive.
-    Supports text files, Google Docs, and PDFs.
+    Supports text files, Google Docs, Sheets, Slides and Drawings, PDFs, DOCX,
+    PPTX and XLSX. Text files over the download limit are returned truncated.
+    PDFs, slide decks and spreadsheets start with their page, slide or sheet
+    count and an outline; read large files a section at a time.
     
     Args:
         token: The OAuth2 access token for the user.
         file_id: The ID of the file to read.
+        pages: Pages (PDF), slides (PPTX) or sheets (XLSX, Google Sheets) to
+               read, e.g. '3', '1-5' or '2,4-6'. Default: all.
+        offset: Character offset to start reading from, for long text.
+        max_chars: Maximum number of characters to return.
+        outline: Include the document outline in the result.
+        rows: Spreadsheet rows to read, e.g. '1-100' or '500-'. Default: all.
+        columns: Spreadsheet columns to read, e.g. 'A-D' or 'C'. Default: all.
+        sheet_format: Spreadsheet output format, 'tsv' or 'csv'.
     """
     try:
-        creds = Credentials(token=token)
-        service = build('drive', 'v3', credentials=creds)
-
-        # Get file metadata to check mimeType
-        file_metadata = service.files().get(fileId=file_id, fields="id, name, mimeType").execute()
-        mime_type = file_metadata.get('mimeType')
-        file_name = file_metadata.get('name', '').lower()
-
-        if mime_type == 'application/vnd.google-apps.document':
-            # Export Google Doc to text
-            request = service.files().export_media(fileId=file_id, mimeType='text/plain')
-            file = io.BytesIO()
-            downloader = MediaIoBaseDownload(file, request)
-            done = False
-            while done is False:
-                status, done = downloader.next_chunk()
-            return file.getvalue().decode('utf-8')
-            
-        elif mime_type == 'application/pdf' or file_name.endswith('.pdf'):
-            # Download PDF and extract text
-            request = service.files().get_media(fileId=file_id)
-            file = io.BytesIO()
-            downloader = MediaIoBaseDownload(file, request)
-            done = False
-            while done is False:
-                status, done = downloader.next_chunk()
-            
-            file.seek(0)
-            reader = PdfReader(file)
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
-            return text
-
-        elif mime_type == 'application/vnd.openxmlformats-officedocument.wordprocessingml.document' or file_name.endswith('.docx'):
-            # Download DOCX and extract text
-            request = service.files().get_media(fileId=file_id)
-            file = io.BytesIO()
-            downloader = MediaIoBaseDownload(file, request)
-            done = False
-            while done is False:
-                status, done = downloader.next_chunk()
-            
-            file.seek(0)
-            doc = Document(file)
-            text = ""
-            for para in doc.paragraphs:
-                text += para.text + "\n"
-            return text
-
-        elif mime_type == 'application/vnd.openxmlformats-officedocument.presentationml.presentation' or file_name.endswith('.pptx'):
-            # Download PPTX and extract text
-            request = service.files().get_media(fileId=file_id)
-            file = io.BytesIO()
-            downloader = MediaIoBaseDownload(file, request)
-            done = False
-            while done is False:
-                status, done = downloader.next_chunk()
-            
-            file.seek(0)
-            prs = Presentation(file)
-            text = ""
-            for slide in prs.slides:
-                for shape in slide.shapes:
-                    if hasattr(shape, "text"):
-                        text += shape.text + "\n"
-            return text
-
-        elif mime_type == 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet' or file_name.endswith('.xlsx'):
-            # Download XLSX and extract text
-            request = service.files().get_media(fileId=file_id)
-            file = io.BytesIO()
-            downloader = MediaIoBaseDownload(file, request)
-            done = False
-            while done is False:
-                status, done = downloader.next_chunk()
-            
-            file.seek(0)
-            wb = openpyxl.load_workbook(file, data_only=True)
-            text = ""
-            for sheet in wb.sheetnames:
-                ws = wb[sheet]
-                text += f"Sheet: {sheet}\n"
-                for row in ws.iter_rows(values_only=True):
-                    row_text = [str(cell) if cell is not None else "" for cell in row]
-                    text += "\t".join(row_text) + "\n"
-            return text
+        service = _drive_service()
+        http = _authorized_http(token)
 
-        else:
-            # Assume text-based file (txt, json, csv, etc.)
-            request = service.files().get_media(fileId=file_id)
-            file = io.BytesIO()
-            downloader = MediaIoBaseDownload(file, request)
-            done = False
-            while done is False:
-                status, done = downloader.next_chunk()
-
-            try:
-                return file.getvalue().decode('utf-8')
-            except UnicodeDecodeError:
-                return f"Error: File type '{mime_type}' is not supported for text extraction, and could not be decoded as UTF-8 text."
+        # Get file metadata to check access, mimeType, size and revision
+        file_metadata = service.files().get(
+            fileId=file_id, fields=READ_METADATA_FIELDS
+        ).execute(http=http)
+        return _read_file(
+            service,
+            http,
+            file_metadata,
+            pages=pages,
+            offset=offset,
+            max_chars=max_chars,
+            outline=outline,
+            rows=rows,
+            columns=columns,
+            sheet_format=sheet_format,
+        )
+    except UnreadableFileError as e:
+        return f"Error: {e}"
     except Exception as e:
         return f"Error reading file: {str(e)}"
 
+
+def _fetch_metadata_batched(service, http, file_ids: list[str]) -> dict:
+    """
+    Fetch the read metadata of many files with Drive batch requests. Returns
+    file ID -> metadata or exception.
+    """
+    results = {}
+
+    def on_response(request_id, response, exception):
+        results[request_id] = exception if exception is not None else response
+
+    for start in range(0, len(file_ids), DRIVE_BATCH_SIZE):
+        batch = service.new_batch_http_request(callback=on_response)
+        for file_id in file_ids[start:start + DRIVE_BATCH_SIZE]:
+            batch.add(
+                service.files().get(fileId=file_id, fields=READ_METADATA_FIELDS),
+                request_id=file_id,
+            )
+        batch.execute(http=http)
+    return results
+
+
+def _split_bytes(demands: dict, total: int) -> dict:
+    """
+    Share a download budget between files that need demands[id] bytes each.
+    Smaller files get all they need, and what they leave is split evenly
+    between the larger ones, so one big file isn't rejected just because
+    many small ones are read with it.
+    """
+    shares = {}
+    remaining = total
+    pending = sorted(demands, key=demands.get)
+    for i, file_id in enumerate(pending):
+        fair_share = remaining // (len(pending) - i)
+        shares[file_id] = max(1, min(demands[file_id], fair_share))
+        remaining -= shares[file_id]
+    return shares
+
+
+@mcp.tool()
+@run_in_thread
+def read_files(
+    token: str,
+    file_ids: list[str],
+    max_chars: int = DRIVE_READ_MAX_CHARS,
+    outline: bool = False,
+) -> str:
+    """
+    Read several files from Google Drive in one call, e.g. to compare or
+    summarize them. Supports the same file types as read_file_content.
+    The character budget is shared evenly between the files, and the download
+    budget goes first to the files that need the least; use read_file_content
+    to read further into a single file.
+    Returns a JSON list with the content or the error for each file.
+
+    Args:
+        token: The OAuth2 access token for the user.
+        file_ids: The IDs of the files to read.
+        max_chars: Maximum number of characters to return across all files.
+        outline: Include each document's outline in the result.
+    """
+    file_ids = list(dict.fromkeys(file_ids))
+    if not file_ids:
+        return json.dumps({"error": "Pass at least one file ID."})
+    if len(file_ids) > DRIVE_READ_FILES_MAX_FILES:
+        error = f"At most {DRIVE_READ_FILES_MAX_FILES} files can be read at once."
+        return json.dumps({"error": error})
+
+    try:
+        service = _drive_service()
+        metadata = _fetch_metadata_batched(service, _authorized_http(token), file_ids)
+    except Exception as e:
+        return json.dumps({"error": f"Error reading files: {str(e)}"})
+
+    # 0 means no limit, so every file gets at least one character.
+    chars_per_file = max(1, max_chars // len(file_ids)) if max_chars > 0 else 0
+    # Google-native files have no size until they are exported.
+    demands = {}
+    for file_id, file_metadata in metadata.items():
+        if isinstance(file_metadata, Exception):
+            continue
+        size = file_metadata.get('size')
+        demands[file_id] = (
+            min(int(size), DRIVE_MAX_DOWNLOAD_BYTES)
+            if size is not None
+            else DRIVE_MAX_DOWNLOAD_BYTES
+        )
+    bytes_per_file = _split_bytes(demands, DRIVE_READ_FILES_MAX_BYTES)
+
+    def read_one(file_id: str) -> dict:
+        file_metadata = metadata.get(file_id)
+        if isinstance(file_metadata, Exception) or file_metadata is None:
+            return {"id": file_id, "error": f"Error reading file: {file_metadata}"}
+        result = {"id": file_id, "name": file_metadata.get('name', '')}
+        try:
+            # Each worker thread authorizes over its own connection pool.
+            result["content"] = _read_file(
+                service,
+                _authorized_http(token),
+                file_metadata,
+                max_chars=chars_per_file,
+                outline=outline,
+                max_bytes=bytes_per_file[file_id],
+            )
+        except UnreadableFileError as e:
+            result["error"] = f"Error: {e}"
+        except Exception as e:
+            result["error"] = f"Error reading file: {str(e)}"
+        return result
+
+    return json.dumps(list(_read_executor.map(read_one, file_ids)), indent=2)
+
+
+@mcp.custom_route("/stats", methods=["GET"])
+async def stats(request):
+    return JSONResponse({"text_cache": text_cache.stats(), "mirror": mirror.stats()})
+
 if __name__ == "__main__":
     mcp.run(transport="sse")
@@ -0,0 +1,106 @@
+import json
+import threading
+from urllib.parse import parse_qs, urlparse
+
+import httplib2
+import mirror as mirror_module
+import pytest
+from googleapiclient.discovery import build
+from mirror import DriveMirror
+
+FOLDER = "application/vnd.google-apps.folder"
+
+
+class FakeDrive:
+    """Answers the Drive requests the mirror makes from in-memory files."""
+
+    def __init__(self, files: list[dict]):
+        self.files = {file["id"]: file for file in files}
+        self.changes = []
+        self.fail_seed = False
+        self.requests = []
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        url = urlparse(uri)
+        path = url.path.split("/drive/v3/")[1]
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        self.requests.append(path)
+        if path == "about":
+            data = {"user": {"permissionId": "P1"}}
+        elif path == "changes/startPageToken":
+            if self.fail_seed:
+                error = {"error": {"code": 403, "message": "Rate limit exceeded"}}
+                return httplib2.Response({"status": "403"}), json.dumps(error).encode()
+            data = {"startPageToken": "1"}
+        elif path == "files/root":
+            data = {"id": "root-id"}
+        elif path == "changes":
+            data = {"changes": self.changes, "newStartPageToken": query["pageToken"]}
+            self.changes = []
+        elif path == "files":
+            data = {"files": list(self.files.values())}
+        else:
+            raise AssertionError(f"unexpected request for {path}")
+        return httplib2.Response({"status": "200"}), json.dumps(data).encode()
+
+
+@pytest.fixture
+def drive():
+    return FakeDrive([
+        {"id": "a", "name": "Budget", "mimeType": "text/plain", "parents": ["root-id"]},
+        {"id": "b", "name": "Docs", "mimeType": FOLDER, "parents": ["root-id"]},
+        {"id": "c", "name": "Notes", "mimeType": "text/plain", "parents": ["b"]},
+    ])
+
+
+@pytest.fixture
+def mirror(tmp_path, drive):
+    service = build("drive", "v3", http=drive, static_discovery=True)
+    return DriveMirror(lambda: service, lambda token: drive, str(tmp_path / "m.db"))
+
+
+def list_folder(mirror, folder_id="root", page_size=100, page_token="", **kwargs):
+    page = mirror.list_folder(
+        "token", folder_id, "folder,name", page_size, page_token, ["id"], **kwargs
+    )
+    return page if page is None else json.loads(page)
+
+
+def test_folders_are_listed_from_the_mirror(mirror, drive):
+    mirror._seed("P1", "token")
+
+    first = list_folder(mirror, page_size=1)
+    assert first == {"files": [{"id": "b"}], "next_page_token": "mirror:1"}
+    second = list_folder(mirror, page_size=1, page_token=first["next_page_token"])
+    assert second == {"files": [{"id": "a"}], "next_page_token": None}
+
+    drive.changes = [
+        {"fileId": "c", "removed": True},
+        {"fileId": "d", "file": {"id": "d", "name": "New", "parents": ["b"]}},
+    ]
+    assert list_folder(mirror, "b")["files"] == [{"id": "c"}]
+    assert list_folder(mirror, "b", max_staleness=0)["files"] == [{"id": "d"}]
+
+
+def test_unknown_folders_are_listed_by_drive(mirror):
+    mirror._seed("P1", "token")
+
+    # Drive answers with its own not-found error.
+    assert list_folder(mirror, "missing") is None
+    # A file that isn't a folder has no children, as in Drive.
+    assert list_folder(mirror, "a")["files"] == []
+
+
+def test_failed_seed_waits_before_retrying(mirror, drive, monkeypatch):
+    drive.fail_seed = True
+    mirror._seed("P1", "token")
+    assert mirror.counters["seed_failures"] == 1
+
+    seeded = threading.Event()
+    monkeypatch.setattr(mirror, "_seed", lambda *args: seeded.set())
+    assert list_folder(mirror) is None
+    assert not seeded.wait(0.1)
+
+    monkeypatch.setattr(mirror_module, "DRIVE_MIRROR_SEED_RETRY_INTERVAL", 0)
+    assert list_folder(mirror) is None
+    assert seeded.wait(5)
@@ -0,0 +1,15 @@
+from server import _split_bytes
+
+
+def test_small_files_get_what_they_need():
+    shares = _split_bytes({"small": 10, "medium": 200, "large": 1000}, 600)
+    assert shares == {"small": 10, "medium": 200, "large": 390}
+
+
+def test_what_is_left_is_split_evenly():
+    shares = _split_bytes({"small": 10, "large": 1000, "huge": 5000}, 600)
+    assert shares == {"small": 10, "large": 295, "huge": 295}
+
+
+def test_every_file_gets_at_least_one_byte():
+    assert _split_bytes({"a": 5, "b": 5}, 1) == {"a": 1, "b": 1}
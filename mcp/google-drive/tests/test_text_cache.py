@@ -0,0 +1,47 @@
+import os
+import time
+
+from extract import Extraction
+from text_cache import TextCache
+
+
+def extraction(text: str) -> Extraction:
+    return Extraction(sections=[("", text)])
+
+
+def test_put_and_get(tmp_path):
+    cache = TextCache(str(tmp_path))
+    cache.put("f1", "v1", "", extraction("hello"))
+
+    assert cache.get("f1", "v1").sections == [("", "hello")]
+    assert cache.get("f1", "v2") is None
+    assert cache.get("f1", "v1", "pages=1") is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_entries_survive_a_restart_and_are_evicted_oldest_first(tmp_path):
+    cache = TextCache(str(tmp_path))
+    cache.put("old", "v1", "", extraction("a" * 100))
+    cache.put("new", "v1", "", extraction("b" * 100))
+    old_path = cache._path(cache._key("old", "v1", ""))
+    os.utime(old_path, (time.time() - 60, time.time() - 60))
+
+    reloaded = TextCache(str(tmp_path), max_bytes=cache._size - 1)
+    assert reloaded.get("old", "v1") is None
+    assert reloaded.get("new", "v1").sections == [("", "b" * 100)]
+    assert reloaded.stats()["evictions"] == 1
+
+
+def test_load_only_removes_stale_temp_files(tmp_path):
+    stale = tmp_path / "entry.json.1.1.tmp"
+    in_progress = tmp_path / "entry.json.2.2.tmp"
+    stale.write_text("{")
+    in_progress.write_text("{")
+    long_ago = time.time() - 2 * 3600
+    os.utime(stale, (long_ago, long_ago))
+
+    TextCache(str(tmp_path))
+
+    assert not stale.exists()
+    # Another process may still be writing this one.
+    assert in_progress.exists()
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict
+
+from extract import Extraction
+
+# Extracted text is kept on disk here so it survives restarts.
+DRIVE_TEXT_CACHE_DIR = os.getenv(
+    "DRIVE_TEXT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "drive-text-cache")
+)
+# Least recently used entries are removed once the cache grows past this size.
+DRIVE_TEXT_CACHE_MAX_BYTES = int(
+    os.getenv("DRIVE_TEXT_CACHE_MAX_BYTES", str(512 * 1024 * 1024))
+)
+# Temp files older than this were left by a crashed write and are removed on
+# load. Younger ones may belong to a write still in progress.
+_STALE_TEMP_SECONDS = 3600
+
+
+def file_version(metadata: dict):
+    """
+    Identify the content revision of a Drive file from its metadata. Binary
+    files have an md5Checksum; Google Docs only have a modifiedTime.
+    """
+    return (
+        metadata.get('md5Checksum')
+        or metadata.get('headRevisionId')
+        or metadata.get('modifiedTime')
+    )
+
+
+class TextCache:
+    """
+    On-disk LRU cache of extracted document text.
+
+    Entries are keyed by file ID, revision and extraction options, so a
+    changed file never hits an old entry. Callers must check that the user can
+    read the file (a metadata request with their token) before looking it up.
+    """
+
+    def __init__(
+        self,
+        directory: str = DRIVE_TEXT_CACHE_DIR,
+        max_bytes: int = DRIVE_TEXT_CACHE_MAX_BYTES,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load()
+
+    def _load(self) -> None:
+        # Rebuild the LRU order from file access times left by earlier runs.
+        os.makedirs(self.directory, exist_ok=True)
+        found = []
+        stale_before = time.time() - _STALE_TEMP_SECONDS
+        for entry in os.scandir(self.directory):
+            try:
+                stat = entry.stat()
+                if entry.name.endswith('.json'):
+                    key = entry.name[:-len('.json')]
+                    found.append((stat.st_mtime, key, stat.st_size))
+                elif entry.name.endswith('.tmp'):
+                    if stat.st_mtime < stale_before:
+                        os.remove(entry.path)
+            except FileNotFoundError:
+                # Replaced or removed by another process while scanning.
+                continue
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._size += size
+        with self._lock:
+            self._evict()
+
+    @staticmethod
+    def _key(file_id: str, version: str, options: str) -> str:
+        payload = json.dumps([file_id, version, options]).encode()
+        return hashlib.sha256(payload).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _drop(self, key: str) -> None:
+        self._size -= self._entries.pop(key)
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self) -> None:
+        while self._size > self.max_bytes and self._entries:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def get(self, file_id: str, version, options: str = ""):
+        """Return the cached Extraction, or None."""
+        key = self._key(file_id, version, options) if version else None
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            with self._lock:
+                if key in self._entries:
+                    self._drop(key)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        data['sections'] = [tuple(section) for section in data['sections']]
+        return Extraction(**data)
+
+    def put(self, file_id: str, version, options: str, extraction: Extraction) -> None:
+        if not version:
+            return
+        payload = json.dumps(asdict(extraction)).encode()
+        if len(payload) > self.max_bytes:
+            return
+
+        key = self._key(file_id, version, options)
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(temp_path, path)
+
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)
+            self._entries[key] = len(payload)
+            self._size += len(payload)
+            self._evict()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+text_cache = TextCache()
@@ -1,4 +1,7 @@
 from mcp.server.fastmcp import FastMCP
+import os
+import functools
+import anyio
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 import json
@@ -6,7 +9,24 @@ import json
 # Initialize FastMCP server
 mcp = FastMCP("slack", host="0.0.0.0", port=8080)
 
+# Tool bodies make blocking API calls, so they run on worker threads instead
+# of the event loop. This caps how many run at once in this server process.
+MCP_MAX_CONCURRENCY = int(os.getenv("MCP_MAX_CONCURRENCY", "16"))
+_tool_limiter = anyio.CapacityLimiter(MCP_MAX_CONCURRENCY)
+
+
+def run_in_thread(func):
+    """Run a blocking tool on a worker thread, keeping the server responsive."""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await anyio.to_thread.run_sync(
+            functools.partial(func, *args, **kwargs), limiter=_tool_limiter
+        )
+    return wrapper
+
+
 @mcp.tool()
+@run_in_thread
 def list_channels(token: str, types: str = "public_channel,private_channel,im,mpim") -> str:
     """
     List public and private channels, DMs, and MPIMs in the workspace.
@@ -48,6 +68,7 @@ def list_channels(token: str, types: str = "public_channel,private_channel,im,mp
         return json.dumps({"error": str(e)})
 
 @mcp.tool()
+@run_in_thread
 def get_channel_history(token: str, channel_id: str, limit: int = 50) -> str:
     """
     Fetch message history from a channel.
@@ -76,6 +97,7 @@ def get_channel_history(token: str, channel_id: str, limit: int = 50) -> str:
         return json.dumps({"error": str(e)})
 
 @mcp.tool()
+@run_in_thread
 def get_thread_replies(token: str, channel_id: str, thread_ts: str) -> str:
     """
     Fetch replies from a specific message thread.
@@ -104,6 +126,7 @@ def get_thread_replies(token: str, channel_id: str, thread_ts: str) -> str:
         return json.dumps({"error": str(e)})
 
 @mcp.tool()
+@run_in_thread
 def search_messages(token: str, query: str, count: int = 20) -> str:
     """
     Search for messages matching a query.
@@ -133,6 +156,7 @@ def search_messages(token: str, query: str, count: int = 20) -> str:
         return json.dumps({"error": str(e)})
 
 @mcp.tool()
+@run_in_thread
 def list_users(token: str) -> str:
     """
     List all users in the workspace to map IDs to names.